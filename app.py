@@ -3,17 +3,35 @@ from flask_cors import CORS,cross_origin #type: ignore
 import json
 
 from weather_condition.weather import Weather
-from html.web_application import html_content
+from weather_condition.batch import BatchProcessor
+from weather_condition.prefetch import PrefetchScheduler
+from weather_condition.settings import getenv
+from weather_condition.metrics import metrics
+from weather_condition.fulfillment import FulfillmentResponse
 
 app = Flask(__name__)
 CORS(app)
 
 weather = Weather()
+batch_processor = BatchProcessor(weather)
+
+# Keep the most popular cities warm after every OpenWeatherMap update (opt-in, it spends API calls)
+prefetch_scheduler = PrefetchScheduler(
+    weather,
+    top_n=int(getenv("PREFETCH_TOP_N", "0")),
+    calls_per_minute=int(getenv("OWM_CALLS_PER_MINUTE", "60")),
+    quota_share=float(getenv("PREFETCH_QUOTA_SHARE", "0.1")),
+)
+if prefetch_scheduler.top_n > 0:
+    prefetch_scheduler.start()
 
 @app.route('/')
 def index():
     """Endpoint to indicate that the webhook server is running"""
 
+    # The page is only needed when someone opens it, so it is not loaded at startup
+    from webpage.web_application import html_content
+
     return render_template_string(html_content)
 
 # geting and sending response to dialogflow
@@ -32,14 +50,57 @@ def webhook():
     """
 
     # Get the request data from Google Dialogflow ES request
-    request_json = request.get_json(silent=True, force=True)
+    with metrics.stage("request_decode"):
+        request_json = request.get_json(silent=True, force=True)
 
     # Process the request using the Weather class
-    response = weather.process_request(request_json)
+    with metrics.stage("process_request"):
+        response = weather.process_request(request_json)
     
-    # Return the response
+    # Return the response, forecasts come with their serialized envelope
+    with metrics.stage("jsonify"):
+        if isinstance(response, FulfillmentResponse):
+            return app.response_class(response.to_json(), mimetype="application/json")
+        return jsonify(response)
+
+@app.route('/batch', methods=['POST'])
+@cross_origin()
+def batch():
+    """
+    Endpoint to answer many forecast queries in one request
+
+    Expects a JSON body of the form {"queries": [{"city": "London", "date": "2025-02-24",
+    "attribute": "temperature"}, ...]}. The forecasts of all cities are fetched concurrently
+    and every query gets either a Dialogflow formatted `response` or an `error`.
+
+    Returns:
+        A JSON response containing the results in the order of the queries.
+    """
+
+    request_json = request.get_json(silent=True, force=True) or {}
+    if not isinstance(request_json, dict):
+        return jsonify({"error": "Expected a JSON object with a list of queries"}), 400
+    try:
+        response = batch_processor.process(request_json.get("queries"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     return jsonify(response)
 
+@app.route('/status')
+def status():
+    """Endpoint exposing the forecast cache and upstream client state for monitoring"""
+
+    stats = weather.stats()
+    stats["prefetch"] = prefetch_scheduler.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Endpoint exposing the per-stage latency histograms in the Prometheus text format (METRICS_ENABLED=1)"""
+
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
 if __name__ == "__main__":
     """
     This is the application’s entry point. 
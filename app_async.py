@@ -0,0 +1,90 @@
+from aiohttp import web #type: ignore
+import json
+
+from weather_condition.async_weather import AsyncWeather
+from weather_condition.metrics import metrics
+from weather_condition.fulfillment import FulfillmentResponse
+
+weather = AsyncWeather()
+
+@web.middleware
+async def cors(request, handler):
+    """Adds the CORS headers that `flask_cors` adds to the Flask application"""
+
+    if request.method == "OPTIONS":
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = request.headers.get("Access-Control-Request-Headers", "*")
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+async def index(request):
+    """Endpoint to indicate that the webhook server is running"""
+
+    from webpage.web_application import html_content
+
+    return web.Response(text=html_content, content_type="text/html")
+
+async def webhook(request):
+    """
+    Endpoint to handle Dialogflow fulfillment requests
+
+    Same contract as the `/webhook` endpoint of `app.py`, but the request is processed
+    on the event loop, so waiting on OpenWeatherMap doesn't block a worker thread.
+
+    Returns:
+        A JSON response containing the response from the fulfillment code.
+    """
+
+    # Get the request data from Google Dialogflow ES request, ignoring the content type
+    body = await request.read()
+    with metrics.stage("request_decode"):
+        try:
+            request_json = json.loads(body)
+        except ValueError:
+            request_json = None
+
+    # Process the request using the AsyncWeather class
+    with metrics.stage("process_request"):
+        response = await weather.process_request_async(request_json)
+
+    # Return the response, forecasts come with their serialized envelope
+    with metrics.stage("jsonify"):
+        if isinstance(response, FulfillmentResponse):
+            return web.Response(body=response.to_json(), content_type="application/json")
+        return web.json_response(response)
+
+async def status(request):
+    """Endpoint exposing the forecast cache and upstream client state for monitoring"""
+
+    return web.json_response(weather.stats())
+
+async def prometheus_metrics(request):
+    """Endpoint exposing the per-stage latency histograms in the Prometheus text format (METRICS_ENABLED=1)"""
+
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+async def close_weather(app):
+    """Closes the upstream connections on shutdown"""
+
+    await weather.close()
+
+def create_app() -> web.Application:
+    """Creates the asyncio web application, e.g. for `gunicorn app_async:create_app --worker-class aiohttp.GunicornWebWorker`"""
+
+    app = web.Application(middlewares=[cors])
+    app.router.add_get("/", index)
+    app.router.add_post("/webhook", webhook)
+    app.router.add_get("/status", status)
+    app.router.add_get("/metrics", prometheus_metrics)
+    app.on_cleanup.append(close_weather)
+    return app
+
+if __name__ == "__main__":
+    """
+    This is the entry point of the asyncio server.
+    It serves the same endpoints as `app.py` on port 5050.
+    """
+    web.run_app(create_app(), host="0.0.0.0", port=5050)
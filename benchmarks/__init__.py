@@ -0,0 +1,4 @@
+"""Benchmarks for the AI Weather Chatbot webhook.
+
+Run from the repository root, e.g. `python -m benchmarks.concurrency`.
+"""
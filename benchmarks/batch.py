@@ -0,0 +1,74 @@
+"""Vectorized batch aggregation vs. the per-city daily summaries.
+
+Aggregates the daily min/max temperature, wind range and modal wind speed and weather
+of 10, 100 and 1000 cities with `aggregate_daily` and with `ForecastSummary.from_compact`,
+checks that both agree and reports the speedup. With `local_time`, cities in time zones
+off the 3 hour grid (e.g. UTC+1, UTC+5:30) are checked against the per-city summaries of
+their slots shifted to local time. Requires numpy.
+
+Usage:
+    python -m benchmarks.batch
+"""
+from array import array
+import argparse
+import time
+
+from weather_condition.batch_aggregate import aggregate_daily
+from weather_condition.compact_forecast import CompactForecast
+from weather_condition.daily_summary import ForecastSummary
+from benchmarks.common import synthetic_forecast
+
+FIELDS = ("temp_min", "temp_max", "wind_min", "wind_max", "wind_mode", "weather")
+# UTC offsets in seconds of the cities in the local time check: UTC, Berlin, India, Nepal, New York, Chatham Islands
+TIMEZONES = (0, 3600, 19800, 20700, -18000, 49500)
+
+def expected_days(forecast: CompactForecast) -> dict:
+    """Returns the daily statistics of the per-city summaries, keyed by date."""
+    return {date: {name: getattr(day, name) for name in FIELDS} for date, day in ForecastSummary.from_compact(forecast).days.items()}
+
+def local_copy(forecast: CompactForecast) -> CompactForecast:
+    """Returns the forecast with its slots shifted to local time, so its UTC days are the local days."""
+    local = CompactForecast.from_bytes(forecast.to_bytes())
+    local.dt = array("q", (dt + forecast.timezone for dt in forecast.dt))
+    local.timezone = 0
+    return local
+
+def best_of(fn, repeat: int) -> float:
+    """Returns the fastest of `repeat` runs of `fn` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--cities", type=int, nargs="+", default=[10, 100, 1000], help="Batch sizes")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = arg_parser.parse_args()
+
+    print(f"{'cities':>8} {'scalar':>10} {'vectorized':>11} {'speedup':>8}")
+    for count in args.cities:
+        forecasts = [CompactForecast.from_owm(synthetic_forecast(f"City{i}", i)) for i in range(count)]
+
+        # Both paths must produce the same statistics
+        batch = aggregate_daily(forecasts)
+        for i, forecast in enumerate(forecasts):
+            if batch.days(i) != expected_days(forecast):
+                raise SystemExit(f"Mismatch for {forecast.city_name}")
+
+        # Grouped by local days, also in time zones off the 3 hour grid
+        for i, forecast in enumerate(forecasts):
+            forecast.timezone = TIMEZONES[i % len(TIMEZONES)]
+        batch = aggregate_daily(forecasts, local_time=True)
+        for i, forecast in enumerate(forecasts):
+            if batch.days(i) != expected_days(local_copy(forecast)):
+                raise SystemExit(f"Local time mismatch for {forecast.city_name} (UTC{forecast.timezone / 3600:+g}h)")
+
+        scalar = best_of(lambda: [ForecastSummary.from_compact(forecast) for forecast in forecasts], args.repeat)
+        vectorized = best_of(lambda: aggregate_daily(forecasts), args.repeat)
+        print(f"{count:>8} {scalar * 1000:>8.1f}ms {vectorized * 1000:>9.1f}ms {scalar / vectorized:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""City resolution: compiling and loading a bulk city list, lookups and upstream calls saved.
+
+Writes a synthetic city list in the format of OpenWeatherMap's `city.list.json.gz`,
+compiles it with `CityIndex`, loads the compiled index again like a restarted worker
+would and reports the time per lookup and of the first lookup on a fresh deploy. Then answers turns for aliases of one city and
+for a city OpenWeatherMap doesn't know against the local stand-in, and counts the
+upstream calls.
+
+Usage:
+    python -m benchmarks.cities --cities 200000 --turns 300
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from weather_condition.city_index import CityIndex
+from weather_condition.weather import Weather
+from benchmarks.common import webhook_request
+from benchmarks.owm_standin import OWMStandIn
+
+SPELLINGS = ("NYC", "New York", "new york city", "New  York", "NY")
+UNKNOWN = "Atlantis"
+
+class RejectingStandIn(OWMStandIn):
+    """Stand-in that doesn't know `UNKNOWN`, like OpenWeatherMap."""
+
+    def respond(self, path: str):
+        if f"q={UNKNOWN}" in path:
+            with self._lock:
+                self.calls += 1
+            return 404, json.dumps({"cod": "404", "message": "city not found"}).encode()
+        return super().respond(path)
+
+def write_city_list(path: str, count: int, seed: int = 0) -> None:
+    """Writes `count` cities, a few names are shared by several cities like in the real list."""
+    rng = random.Random(seed)
+    cities = [{"id": 5128581, "name": "New York", "state": "NY", "country": "US", "coord": {"lon": -74.006, "lat": 40.7143}}]
+    for i in range(count - 1):
+        name = f"Town {i // 3}" if i % 50 == 0 else f"City {i}"
+        cities.append({"id": 1_000_000 + i, "name": name, "state": "", "country": "XX",
+                       "coord": {"lon": rng.uniform(-180, 180), "lat": rng.uniform(-90, 90)}})
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump(cities, file)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--cities", type=int, default=200000, help="Cities in the synthetic city list")
+    arg_parser.add_argument("--turns", type=int, default=300, help="Webhook turns for the upstream call count")
+    args = arg_parser.parse_args()
+    weather = Weather()  # Sets up logging before the index logs
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "city.list.json.gz")
+        write_city_list(path, args.cities)
+        print(f"city list: {args.cities} cities, {os.path.getsize(path) / 2**20:.1f} MiB gzipped")
+
+        started = time.perf_counter()
+        CityIndex(path).load()
+        print(f"compile:   {time.perf_counter() - started:6.2f}s  ({os.path.getsize(path + '.idx') / 2**20:.1f} MiB compiled)")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = CityIndex(path)
+        index.load()
+        loaded = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"load:      {loaded * 1000:6.1f}ms  ({memory / 2**20:.1f} MiB in memory)")
+
+        names = [f"City {i}" for i in range(1, args.cities, max(1, args.cities // 1000))] + list(SPELLINGS)
+        started = time.perf_counter()
+        for name in names:
+            index.resolve(name)
+        print(f"lookup:    {(time.perf_counter() - started) / len(names) * 1e6:6.2f}µs per name")
+        print(f"NYC:       {index.resolve('NYC')}")
+
+        weather.city_index = index
+        # A fresh deploy has no compiled index yet, the first turn must not wait for the compile
+        fresh = os.path.join(folder, "fresh")
+        os.mkdir(fresh)
+        first = CityIndex(shutil.copy(path, fresh))
+        started = time.perf_counter()
+        unresolved = first.resolve("New York")
+        waited = time.perf_counter() - started
+        first.load()  # Waits for the background compile
+        print(f"fresh:     {waited * 1000:6.1f}ms for the first lookup (city id {unresolved.city_id}), "
+              f"after the background compile: {first.resolve('New York').city_id}")
+
+        with RejectingStandIn(latency=0) as owm:
+            weather.base_url = owm.url
+            turns = [SPELLINGS[turn % len(SPELLINGS)] if turn % 2 else UNKNOWN for turn in range(args.turns)]
+            for city in turns:
+                weather.process_request(webhook_request(city))
+            previous = len({" ".join(city.split()).casefold() for city in turns if city != UNKNOWN}) + turns.count(UNKNOWN)
+            print(f"{args.turns} turns for {len(SPELLINGS)} spellings of New York and {UNKNOWN}:")
+            print(f"  upstream calls: {owm.calls} (one per spelling and every {UNKNOWN} turn without the index: {previous})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import math
+import time
+
+# Weather descriptions cycled through the synthetic forecast slots (OWM weather id, description)
+DESCRIPTIONS = [
+    (500, "light rain"),
+    (800, "clear sky"),
+    (803, "broken clouds"),
+    (600, "light snow"),
+    (741, "fog"),
+    (802, "scattered clouds"),
+]
+
+def synthetic_forecast(city: str = "London", city_id: int = 2643743, now: Optional[float] = None) -> Dict:
+    """Builds an OpenWeatherMap 5 day / 3 hour forecast payload with 40 slots.
+
+    Args:
+        city (str): City name reported in the payload.
+        city_id (int): OpenWeatherMap city id reported in the payload.
+        now (float, optional): Unix time the forecast starts after. Defaults to `time.time()`.
+
+    Returns:
+        dict: Forecast payload in the format of the `/data/2.5/forecast` endpoint.
+    """
+    now = int(time.time() if now is None else now)
+    start = now - now % 10800 + 10800
+    seed = sum(map(ord, city))
+    slots = []
+    for i in range(40):
+        dt = start + i * 10800
+        weather_id, description = DESCRIPTIONS[(i + seed) % len(DESCRIPTIONS)]
+        slots.append({
+            "dt": dt,
+            "main": {"temp": round(5 + (i * 7 + seed) % 15 * 0.7, 2), "feels_like": 4.1, "temp_min": 4.0, "temp_max": 16.0,
+                     "pressure": 1012, "sea_level": 1012, "grnd_level": 1008, "humidity": 81, "temp_kf": 0},
+            "weather": [{"id": weather_id, "main": description.split()[-1].title(), "description": description, "icon": "10d"}],
+            "clouds": {"all": 75},
+            "wind": {"speed": round((i * 3 + seed) % 9 * 0.8, 2), "deg": 240, "gust": 7.3},
+            "visibility": 10000,
+            "pop": 0.2,
+            "rain": {"3h": 0.3},
+            "sys": {"pod": "d"},
+            "dt_txt": datetime.fromtimestamp(dt, timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": len(slots),
+        "list": slots,
+        "city": {"id": city_id, "name": city, "coord": {"lat": 51.5085, "lon": -0.1257}, "country": "GB",
+                 "population": 1000000, "timezone": 0, "sunrise": start, "sunset": start + 36000},
+    }
+
+def webhook_request(city: str, date_time=None, **parameters) -> Dict:
+    """Builds a Dialogflow ES fulfillment request for the weather intent.
+
+    Args:
+        city (str): Value of the `geo-city` parameter.
+        date_time (optional): Value of the `date-time` parameter. Defaults to today.
+        **parameters: Additional parameters such as `weather-condition`.
+
+    Returns:
+        dict: The webhook request.
+    """
+    if date_time is None:
+        date_time = [datetime.now().astimezone().replace(hour=12, minute=0, second=0, microsecond=0).isoformat()]
+    params = {"geo-city": [city], "date-time": date_time}
+    params.update(parameters)
+    return {
+        "responseId": "benchmark",
+        "queryResult": {
+            "queryText": f"weather in {city}",
+            "action": "",
+            "parameters": params,
+            "outputContexts": [],
+        },
+    }
+
+def date_range(days: int):
+    """Returns a `date-time` parameter spanning today and the next `days` days."""
+    today = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [{"startDate": today.isoformat(), "endDate": (today + timedelta(days=days, hours=23, minutes=59)).isoformat()}]
+
+def percentile(values: list, q: float) -> float:
+    """Returns the `q` percentile (0-100) of sorted `values` by the nearest-rank method."""
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
@@ -0,0 +1,71 @@
+"""Concurrency stress test for `Weather.process_request`.
+
+Replays the same set of turns through one shared `Weather` instance, first on a single
+thread and then on N threads, checks that every concurrent answer matches the sequential
+one and reports the throughput of both runs.
+
+Usage:
+    python -m benchmarks.concurrency --threads 16 --requests 400
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import io
+import time
+
+from weather_condition.quota import QuotaManager
+from weather_condition.weather import Weather
+from benchmarks.common import date_range, webhook_request
+from benchmarks.owm_standin import OWMStandIn
+
+def build_requests(count: int, cities: int) -> list:
+    """Builds `count` turns spread over `cities` cities and all attribute types."""
+    variants = [
+        {},
+        {"weather-condition": ["rain"]},
+        {"temperature": ["cold"]},
+        {"wind-speed": ["windy"]},
+    ]
+    requests = []
+    for i in range(count):
+        date_time = date_range(i % 4) if i % 3 else None
+        requests.append(webhook_request(f"City{i % cities}", date_time, **variants[i % len(variants)]))
+    return requests
+
+def run(weather: Weather, requests: list, threads: int):
+    """Runs all requests with `threads` workers and returns the answers and the elapsed time."""
+    weather.forecast_cache.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        answers = list(executor.map(weather.process_request, requests))
+    return answers, time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--threads", type=int, default=16, help="Number of concurrent threads")
+    arg_parser.add_argument("--requests", type=int, default=400, help="Number of turns per run")
+    arg_parser.add_argument("--cities", type=int, default=100, help="Number of distinct cities")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Simulated upstream latency in seconds")
+    args = arg_parser.parse_args()
+
+    requests = build_requests(args.requests, args.cities)
+    with OWMStandIn(latency=args.latency) as server:
+        weather = Weather()
+        weather.base_url = server.url
+        weather.quota = QuotaManager(10**9)  # The stand-in has no quota
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected, sequential = run(weather, requests, 1)
+            answers, concurrent = run(weather, requests, args.threads)
+
+    mismatches = sum(1 for a, b in zip(expected, answers) if a != b)
+    print(f"requests:        {len(requests)} over {args.cities} cities")
+    print(f"1 thread:        {sequential:.2f}s  ({len(requests) / sequential:.1f} req/s)")
+    print(f"{args.threads} threads:      {concurrent:.2f}s  ({len(requests) / concurrent:.1f} req/s)")
+    print(f"speedup:         {sequential / concurrent:.1f}x")
+    print(f"wrong answers:   {mismatches}")
+    print(f"upstream calls:  {server.calls}")
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
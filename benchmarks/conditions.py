@@ -0,0 +1,67 @@
+"""Condition queries ("Will it rain or snow?"): substring scan vs. the condition index.
+
+The previous condition body tested every requested condition against the lower cased
+description of every weather description of every day. With the index, the requested
+conditions resolve to a mask once per turn and every day is one mask test. Reports the
+time of the condition body for 6 days and 1 to 6 requested conditions.
+
+Usage:
+    python -m benchmarks.conditions --number 5000
+"""
+from collections import Counter
+import argparse
+import time
+
+from weather_condition.compact_forecast import CompactForecast
+from weather_condition.dialog_handler import DialogHandler
+from benchmarks.common import synthetic_forecast
+
+QUERIES = (
+    ["rain"],
+    ["rain", "snow"],
+    ["rain", "snow", "fog"],
+    ["rain", "snow", "fog", "thunderstorm", "clouds", "clear"],
+)
+
+def previous_body(selected_dates, daily_forecasts, condition) -> list:
+    """The condition body before the index, with the counter reset per day."""
+    forecast = []
+    for date in selected_dates:
+        day = daily_forecasts[date]
+        common_weather = Counter()
+        for description, slots in day.descriptions.items():
+            for i in condition:
+                if i in description.lower():
+                    common_weather[description.title()] += slots
+                else:
+                    common_weather[f"No {i}"] += slots
+        forecast.append({"date": day.label, "weather": common_weather.most_common(1)[0][0]})
+    return forecast
+
+def time_per_call(function, args, number: int) -> float:
+    """Returns the mean time of a call in seconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        function(*args)
+    return (time.perf_counter() - start) / number
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--number", type=int, default=5000, help="Condition bodies built per measurement")
+    args = arg_parser.parse_args()
+
+    summary = CompactForecast.from_owm(synthetic_forecast("London")).summary
+    dates = list(summary.days)[:6]
+    # The body is private to the handler, it is timed without building the response around it
+    indexed_body = DialogHandler()._DialogHandler__forecast_body_condition
+
+    print(f"{len(dates)} days, slot descriptions: {', '.join(sorted({d for day in summary.days.values() for d in day.descriptions}))}")
+    for query in QUERIES:
+        previous = time_per_call(previous_body, (dates, summary.days, query), args.number)
+        indexed = time_per_call(indexed_body, (dates, summary.days, query), args.number)
+        print(f"  {' or '.join(query):<56} previous {previous * 1e6:7.2f}µs  indexed {indexed * 1e6:7.2f}µs")
+    answers = [entry["weather"] for entry in indexed_body(dates, summary.days, ["rain", "snow"])]
+    print(f"rain or snow: {answers}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Date parsing of the `date-time` parameter: dateutil vs. the ISO-8601 fast path.
+
+Builds the payload shapes handled by `DateHandler` (date period dicts, lists of one
+dict or string, lists of two strings and plain strings) for the next days, checks that
+`parse_date` agrees with `dateutil.parser.parse` on every value and reports the time
+per value of dateutil, of the uncached fast path and of the memoized `parse_date`.
+
+Usage:
+    python -m benchmarks.dates --repeat 5
+"""
+from datetime import datetime, timedelta
+import argparse
+import contextlib
+import io
+import time
+
+from dateutil import parser #type: ignore
+
+from weather_condition.date_handler import DateHandler, parse_date
+
+def build_shapes(days: int = 6) -> dict:
+    """Returns example `date-time` parameters of every shape, keyed by shape name."""
+    today = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = [today + timedelta(days=day) for day in range(days)]
+    noon = [date.replace(hour=12).isoformat() for date in dates]
+    return {
+        "period dict": [{"startDate": date.isoformat(), "endDate": date.replace(hour=23, minute=59, second=59).isoformat()} for date in dates],
+        "date_time dict": [{"date_time": value} for value in noon],
+        "list of one dict": [[{"startDateTime": date.isoformat(), "endDateTime": date.replace(hour=18).isoformat()}] for date in dates],
+        "list of one string": [[value] for value in noon],
+        "list of two strings": [[noon[0], value] for value in noon],
+        "string": noon,
+        "plain date": [date.strftime("%Y-%m-%d") for date in dates],
+    }
+
+def values_of(shape) -> list:
+    """Returns the date strings contained in a `date-time` parameter."""
+    if isinstance(shape, str):
+        return [shape]
+    if isinstance(shape, dict):
+        return [value for value in shape.values() if isinstance(value, str)]
+    return [value for item in shape for value in values_of(item)]
+
+def per_value(fn, values: list, repeat: int) -> float:
+    """Returns the fastest time per value in microseconds of `repeat` passes over `values`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            fn(value)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / len(values) * 1e6
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Passes per measurement")
+    arg_parser.add_argument("--copies", type=int, default=200, help="Copies of every value per pass")
+    args = arg_parser.parse_args()
+
+    shapes = build_shapes()
+    print(f"{'shape':<20} {'dateutil':>10} {'isoformat':>10} {'memoized':>10} {'speedup':>8}")
+    for name, params in shapes.items():
+        values = [value for shape in params for value in values_of(shape)] * args.copies
+        for value in set(values):
+            if parse_date(value) != parser.parse(value).date():
+                raise SystemExit(f"Mismatch for {value!r}")
+        slow = per_value(parser.parse, values, args.repeat)
+        fast = per_value(lambda value: datetime.fromisoformat(value).date(), values, args.repeat)
+        memoized = per_value(parse_date, values, args.repeat)
+        print(f"{name:<20} {slow:>8.2f}us {fast:>8.2f}us {memoized:>8.2f}us {slow / memoized:>7.1f}x")
+
+    # Whole validation of one turn, as run by the webhook
+    handler = DateHandler()
+    params = [shape for shapes_of_kind in shapes.values() for shape in shapes_of_kind]
+    with contextlib.redirect_stdout(io.StringIO()):
+        turn = per_value(handler.check_date_range, params * args.copies, args.repeat)
+    print(f"check_date_range: {turn:.2f}us per turn")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Decoding of an OpenWeatherMap forecast into a `CompactForecast`.
+
+Compares the previous path, `response.json()` of `requests` which decodes the body to
+text before parsing it, with `decode_body` parsing the raw bytes once, with orjson if it
+is installed and with the standard library. Reports the time and the peak of allocated
+memory per forecast of 40 slots.
+
+Usage:
+    python -m benchmarks.decode --number 2000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import requests #type: ignore
+
+from weather_condition import owm_client
+from weather_condition.compact_forecast import CompactForecast
+from weather_condition.owm_client import decode_body
+from benchmarks.common import synthetic_forecast
+
+def fetched_response(body: bytes) -> requests.Response:
+    """Returns a `requests` response with the body and headers OpenWeatherMap sends."""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    response.encoding = "utf-8"
+    response._content = body
+    return response
+
+def time_per_call(function, number: int) -> float:
+    """Returns the mean time of a call in seconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number
+
+def peak_per_call(function) -> int:
+    """Returns the peak of memory allocated during one call in bytes."""
+    function()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--number", type=int, default=2000, help="Forecasts decoded per measurement")
+    args = arg_parser.parse_args()
+
+    body = json.dumps(synthetic_forecast("London")).encode()
+
+    def previous():
+        # A fresh response per call, `requests` caches the decoded text on it
+        return CompactForecast.from_owm(fetched_response(body).json())
+
+    paths = [
+        ("response.json()", previous),
+        ("decode_body, json", lambda: CompactForecast.from_owm(json.loads(body))),
+    ]
+    if owm_client.orjson is not None:
+        paths.append(("decode_body, orjson", lambda: CompactForecast.from_owm(decode_body(body))))
+    else:
+        print("orjson is not installed, pip install -r requirements-fast.txt")
+
+    expected = previous().to_bytes()
+    print(f"forecast body: {len(body) / 1024:.1f} KiB, 40 slots")
+    for name, function in paths:
+        assert function().to_bytes() == expected
+        seconds = time_per_call(function, args.number)
+        peak = peak_per_call(function)
+        print(f"  {name:<20} {seconds * 1e6:8.1f}µs  peak {peak / 1024:6.1f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Load test of the webhook with requests generated from the Dialogflow agent.
+
+HTTP mode replays the requests against `/webhook` with a number of concurrent clients
+and reports latency percentiles, requests per second and the peak memory of the
+process. Without `--url` the Flask app is served in-process against a local stand-in
+of the OpenWeatherMap API, so no API key is needed.
+
+Micro mode skips HTTP and calls `Weather.process_request` and
+`DialogHandler.format_forecast_output` directly with warm caches, to measure the
+cost of a turn itself.
+
+Usage:
+    python -m benchmarks.load --requests 2000 --concurrency 16
+    python -m benchmarks.load --url http://localhost:5050/webhook --concurrency 32
+    python -m benchmarks.load --no-cache --slow-share 0.02 --error-rate 0.01
+    python -m benchmarks.load --mode micro --requests 5000
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import resource
+import threading
+import time
+
+from benchmarks.common import percentile
+from benchmarks.owm_standin import OWMStandIn
+from benchmarks.payloads import PayloadGenerator
+
+def report(name: str, latencies: list, elapsed: float, errors: int = 0) -> None:
+    """Prints latency percentiles and throughput of a run."""
+    latencies = sorted(latencies)
+    p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+    print(f"{name:<22} {len(latencies) / elapsed:>9.1f}/s  p50 {p50:7.2f}ms  p95 {p95:7.2f}ms  p99 {p99:7.2f}ms  errors {errors}")
+
+def peak_memory() -> str:
+    """Returns the peak resident memory of this process."""
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB"
+
+@contextlib.contextmanager
+def local_webhook(cache: bool = True, **stand_in):
+    """Serves `app.py` on a free local port against a stand-in of OpenWeatherMap.
+
+    Args:
+        cache (bool): Keep the forecast cache; without it every turn calls the stand-in.
+        **stand_in: Options of the `OWMStandIn`, e.g. its latency and error rate.
+    """
+    from werkzeug.serving import make_server #type: ignore
+
+    import app
+    from weather_condition.quota import QuotaManager
+
+    with OWMStandIn(**stand_in) as owm:
+        app.weather.base_url = owm.url
+        # Spend the quota of the stand-in, if it has one
+        app.weather.quota = QuotaManager(stand_in.get("calls_per_minute") or 10**9)
+        if not cache:
+            app.weather.forecast_cache.max_entries = 0
+        server = make_server("127.0.0.1", 0, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            yield f"http://127.0.0.1:{server.server_port}/webhook", owm
+        finally:
+            server.shutdown()
+
+def run_http(url: str, payloads: list, concurrency: int):
+    """Posts all payloads with `concurrency` clients and returns the latencies, elapsed time and errors."""
+    import requests #type: ignore
+
+    local = threading.local()
+    errors = []
+
+    def post(payload):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(url, json=payload, timeout=30)
+            if response.status_code != 200 or not response.json():
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(e)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(post, payloads))
+    return latencies, time.perf_counter() - start, len(errors)
+
+def run_micro(payloads: list) -> None:
+    """Times `Weather.process_request` and `DialogHandler.format_forecast_output` in-process."""
+    from weather_condition.quota import QuotaManager
+    from weather_condition.weather import Weather
+
+    with OWMStandIn(latency=0) as owm:
+        weather = Weather()
+        weather.base_url = owm.url
+        weather.quota = QuotaManager(10**9)  # The stand-in has no quota
+        for payload in payloads:
+            weather.process_request(payload)  # Warm the forecast cache
+
+        latencies = []
+        start = time.perf_counter()
+        for payload in payloads:
+            turn = time.perf_counter()
+            weather.process_request(payload)
+            latencies.append(time.perf_counter() - turn)
+        report("process_request", latencies, time.perf_counter() - start)
+
+        # Only turns that reach the formatter, fallbacks (e.g. dates too far ahead) and
+        # error responses of the date validation are skipped
+        turns = []
+        for payload in payloads:
+            prepared = weather._prepare_request(payload)
+            if not isinstance(prepared, dict) and isinstance(prepared[1], tuple):
+                context, time_range = prepared
+                turns.append((context, time_range, weather.get_forecast(context.city)))
+        latencies = []
+        start = time.perf_counter()
+        for context, time_range, forecast in turns:
+            turn = time.perf_counter()
+            weather.dialog_handler.format_forecast_output(context, time_range, forecast)
+            latencies.append(time.perf_counter() - turn)
+        report("format_forecast_output", latencies, time.perf_counter() - start)
+        print(f"upstream calls: {owm.calls}, answered turns: {len(turns)} of {len(payloads)}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--mode", choices=("http", "micro"), default="http", help="Replay over HTTP or call the handlers directly")
+    arg_parser.add_argument("--requests", type=int, default=1000, help="Number of requests")
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients in HTTP mode")
+    arg_parser.add_argument("--url", help="Webhook to test, defaults to an in-process server")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Latency in seconds of the OpenWeatherMap stand-in")
+    arg_parser.add_argument("--slow-share", type=float, default=0.0, help="Share of slow responses of the stand-in")
+    arg_parser.add_argument("--slow-latency", type=float, default=2.0, help="Latency in seconds of slow responses")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests the stand-in answers with 503")
+    arg_parser.add_argument("--calls-per-minute", type=int, help="Quota of the stand-in, further calls get 429")
+    arg_parser.add_argument("--fixtures", help="Folder of recorded forecasts replayed by the stand-in")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Fetch the forecast on every turn, to measure upstream tail latency")
+    arg_parser.add_argument("--followup-share", type=float, default=0.4, help="Share of followup turns")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed of the generated requests")
+    args = arg_parser.parse_args()
+
+    payloads = PayloadGenerator(seed=args.seed, followup_share=args.followup_share).batch(args.requests)
+
+    if args.mode == "micro":
+        run_micro(payloads)
+    elif args.url:
+        report(f"http x{args.concurrency}", *run_http(args.url, payloads, args.concurrency))
+    else:
+        stand_in = {
+            "latency": args.latency, "slow_share": args.slow_share, "slow_latency": args.slow_latency,
+            "error_rate": args.error_rate, "calls_per_minute": args.calls_per_minute, "fixtures": args.fixtures,
+            "seed": args.seed,
+        }
+        with local_webhook(cache=not args.no_cache, **stand_in) as (url, owm):
+            report(f"http x{args.concurrency}", *run_http(url, payloads, args.concurrency))
+            print(f"upstream: {owm.stats()}")
+    print(f"peak memory: {peak_memory()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Cost of logging per webhook turn.
+
+Answers the same turns, each fetching a forecast from a local stand-in of the
+OpenWeatherMap API, in fresh interpreters with different logging setups and reports
+the latency per turn:
+
+- before: the `weather_condition` package of an older commit given with `--before`,
+  e.g. the one before logging went through a queue. That code logged and printed every
+  payload, decoded it three times and printed on every turn; its prints go to a pipe.
+- sync: the current code with records written to the file on the request thread and
+  every forecast payload logged, which isolates the cost of synchronous logging.
+- queued: the default setup, records are written by a background thread and 1% of
+  the payloads are logged.
+- warning: the queued setup with LOG_LEVEL=WARNING, as in production.
+
+Usage:
+    python -m benchmarks.log_overhead --requests 300
+    python -m benchmarks.log_overhead --before "$(git log -1 --format=%h --grep='background queue')^"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    "before": {},
+    "sync": {"LOG_SAMPLE_OWM_PAYLOAD": "1"},
+    "queued": {},
+    "warning": {"LOG_LEVEL": "WARNING"},
+}
+
+def child(mode: str, requests: int) -> None:
+    """Runs the turns in this interpreter and prints the latencies as JSON."""
+    import logging
+
+    from weather_condition.weather import Weather
+    from benchmarks.common import webhook_request
+    from benchmarks.owm_standin import OWMStandIn
+
+    if mode == "sync":
+        logging.basicConfig(filename=os.environ["LOG_FILE"], level=logging.INFO,
+                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    turns = [webhook_request(f"City{i}") for i in range(requests)]
+    latencies = []
+    with OWMStandIn(latency=0) as server:
+        weather = Weather()
+        weather.base_url = server.url
+        if hasattr(weather, "quota"):
+            from weather_condition.quota import QuotaManager
+            weather.quota = QuotaManager(10**9)  # The stand-in has no quota, older code had no quota manager
+        weather.process_request(turns[0])  # Warm up imports and the connection pool
+        for turn in turns:
+            weather.forecast_cache.clear()
+            start = time.perf_counter()
+            weather.process_request(turn)
+            latencies.append(time.perf_counter() - start)
+    print(json.dumps(latencies))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=300, help="Turns per logging setup")
+    arg_parser.add_argument("--before", help="Git revision whose weather_condition package is measured as \"before\"")
+    arg_parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.requests)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'setup':<10} {'mean':>9} {'p50':>9} {'p95':>9} {'log size':>10}")
+    for mode, env in MODES.items():
+        if mode == "before" and not args.before:
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, "weather_query.log")
+            cwd = root
+            if mode == "before":
+                # The old package is imported from the working directory, the benchmarks from this tree.
+                # Older code ignores LOG_FILE and logs to weather_query.log in the working directory.
+                archive = subprocess.run(["git", "archive", args.before, "weather_condition"], cwd=root, capture_output=True, check=True).stdout
+                subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+                cwd = directory
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.log_overhead", "--child", mode, "--requests", str(args.requests)],
+                env={**os.environ, **env, "LOG_FILE": log_file, "PYTHONPATH": root}, cwd=cwd,
+                capture_output=True, text=True, check=True,
+            ).stdout
+            latencies = sorted(json.loads(output.strip().splitlines()[-1]))
+            size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+        mean = statistics.mean(latencies) * 1000
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f"{mode:<10} {mean:>7.2f}ms {p50:>7.2f}ms {p95:>7.2f}ms {size / 1024:>8.0f}KiB")
+
+if __name__ == "__main__":
+    main()
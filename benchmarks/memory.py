@@ -0,0 +1,51 @@
+"""Memory footprint of a cached forecast per city.
+
+Compares the decoded OpenWeatherMap payload (nested dicts) with `CompactForecast`,
+with and without its daily summaries, using `tracemalloc`.
+
+Usage:
+    python -m benchmarks.memory --cities 1000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from weather_condition.compact_forecast import CompactForecast
+from benchmarks.common import synthetic_forecast
+
+def measure(build, count: int) -> float:
+    """Returns the bytes allocated per city by `build`, keeping all results alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--cities", type=int, default=1000, help="Number of cached cities")
+    args = arg_parser.parse_args()
+
+    # Payloads as they arrive over the wire, decoded from JSON like `response.json()` does
+    bodies = [json.dumps(synthetic_forecast(f"City{i}", i)) for i in range(args.cities)]
+
+    def compact_with_summary(i):
+        forecast = CompactForecast.from_owm(json.loads(bodies[i]))
+        forecast.summary
+        return forecast
+
+    raw = measure(lambda i: json.loads(bodies[i]), args.cities)
+    compact = measure(lambda i: CompactForecast.from_owm(json.loads(bodies[i])), args.cities)
+    summarized = measure(compact_with_summary, args.cities)
+
+    print(f"cities:                      {args.cities}")
+    print(f"raw payload (dict):          {raw / 1024:8.1f} KiB per city")
+    print(f"CompactForecast:             {compact / 1024:8.1f} KiB per city  ({raw / compact:.1f}x smaller)")
+    print(f"CompactForecast + summaries: {summarized / 1024:8.1f} KiB per city  ({raw / summarized:.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
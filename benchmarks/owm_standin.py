@@ -0,0 +1,239 @@
+"""Local stand-in of the OpenWeatherMap `/data/2.5/forecast` endpoint.
+
+Serves recorded fixtures or synthetic forecasts without network access, with a
+configurable latency, share of slow responses, error rate and per-minute quota
+answered with 429, so upstream slowness and failures can be reproduced. In recording
+mode the requests are forwarded to OpenWeatherMap and the responses are saved as
+fixtures for later replay.
+
+Point the webhook at it with `OWM_BASE_URL`:
+
+    python -m benchmarks.owm_standin --port 8081 --latency 0.1 --error-rate 0.05
+    OWM_BASE_URL=http://127.0.0.1:8081/data/2.5/forecast python app.py
+
+Record fixtures of real forecasts (needs OWM_KEY for the webhook), then replay them:
+
+    python -m benchmarks.owm_standin --port 8081 --fixtures fixtures --record
+    python -m benchmarks.owm_standin --port 8081 --fixtures fixtures
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+from benchmarks.common import synthetic_forecast
+
+OWM_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+SLOT_SECONDS = 3 * 60 * 60
+
+def fixture_name(query: Dict[str, str]) -> str:
+    """Returns the fixture file name of a forecast query, e.g. `q-bad_honnef.json`."""
+    key, value = ("q", query["q"]) if query.get("q") else ("id", query.get("id", ""))
+    return f"{key}-{re.sub(r'[^a-z0-9]+', '_', value.casefold()).strip('_')}.json"
+
+def shift_forecast(data: Dict, now: float) -> Dict:
+    """Moves a recorded forecast in time so its first slot is the next 3 hour slot after `now`.
+
+    The shift is a whole number of slots, so the slots stay on the OpenWeatherMap grid.
+    """
+    if not data.get("list"):
+        return data
+    start = int(now) - int(now) % SLOT_SECONDS + SLOT_SECONDS
+    shift = start - data["list"][0]["dt"]
+    for entry in data["list"]:
+        entry["dt"] += shift
+        entry["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(entry["dt"]))
+    city = data.get("city", {})
+    for field in ("sunrise", "sunset"):
+        if field in city:
+            city[field] += shift
+    return data
+
+class OWMStandIn:
+    """Threaded HTTP server answering like the OpenWeatherMap forecast endpoint.
+
+    Example:
+        with OWMStandIn(latency=0.05, error_rate=0.01) as owm:
+            weather.base_url = owm.url
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, slow_share: float = 0.0, slow_latency: float = 2.0,
+                 error_rate: float = 0.0, calls_per_minute: Optional[int] = None, fixtures: Optional[str] = None,
+                 record: bool = False, synthetic: bool = True, upstream: str = OWM_FORECAST_URL,
+                 host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None):
+        """Initialize the stand-in.
+
+        Args:
+            latency (float): Seconds every response is delayed.
+            jitter (float): Additional random delay of up to this many seconds.
+            slow_share (float): Share of responses delayed by `slow_latency` instead, to model tail latency.
+            slow_latency (float): Delay in seconds of slow responses.
+            error_rate (float): Share of requests answered with 503.
+            calls_per_minute (int, optional): Quota per clock minute; calls beyond it get 429.
+            fixtures (str, optional): Folder of recorded forecasts, served when a fixture matches.
+            record (bool): Forward requests to `upstream` and save the responses in `fixtures`.
+            synthetic (bool): Serve synthetic forecasts for cities without a fixture, instead of 404.
+            upstream (str): OpenWeatherMap endpoint used for recording.
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+            seed (int, optional): Seed of the random delays and errors, for reproducible runs.
+        """
+        if record and not fixtures:
+            raise ValueError("Recording needs a fixtures folder")
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_share = slow_share
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.calls_per_minute = calls_per_minute
+        self.fixtures = fixtures
+        self.record = record
+        self.synthetic = synthetic
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # Current clock minute and calls made in it
+        self.calls = 0  # Requests received
+        self.errors = 0  # Requests answered with 503
+        self.throttled = 0  # Requests answered with 429
+        self.recorded = 0  # Responses saved as fixtures
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, without this the client's delayed ACK adds ~40ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, body = stand_in.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        if self.fixtures:
+            os.makedirs(self.fixtures, exist_ok=True)
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}/data/2.5/forecast"
+
+    def __delay(self) -> float:
+        """Returns the delay of the next response in seconds."""
+        with self._lock:
+            if self.slow_share and self.random.random() < self.slow_share:
+                return self.slow_latency
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def __admit(self) -> Optional[int]:
+        """Counts a call and returns the error status to answer it with, if any."""
+        with self._lock:
+            self.calls += 1
+            if self.calls_per_minute is not None:
+                minute = int(time.time() // 60)
+                window, calls = self._window
+                calls = calls + 1 if window == minute else 1
+                self._window = (minute, calls)
+                if calls > self.calls_per_minute:
+                    self.throttled += 1
+                    return 429
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return 503
+        return None
+
+    def respond(self, path: str) -> Tuple[int, bytes]:
+        """Returns the status and body answering a GET of `path`."""
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(path).query))
+        status = self.__admit()
+        time.sleep(self.__delay())
+        if status == 429:
+            return status, json.dumps({"cod": 429, "message": "Your account is temporary blocked due to exceeding of requests limitation of your subscription type."}).encode()
+        if status == 503:
+            return status, json.dumps({"cod": 503, "message": "Service Unavailable"}).encode()
+
+        if self.record:
+            return self.__record(path, query)
+        fixture = os.path.join(self.fixtures, fixture_name(query)) if self.fixtures else None
+        if fixture and os.path.exists(fixture):
+            with open(fixture, encoding="utf-8") as file:
+                data = shift_forecast(json.load(file), time.time())
+            return 200, json.dumps(data).encode()
+        if self.synthetic and (query.get("q") or query.get("id")):
+            city = query.get("q") or f"City {query['id']}"
+            city_id = int(query["id"]) if query.get("id", "").isdigit() else zlib.crc32(city.casefold().encode()) % 10_000_000
+            return 200, json.dumps(synthetic_forecast(city, city_id)).encode()
+        return 404, json.dumps({"cod": "404", "message": "city not found"}).encode()
+
+    def __record(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes]:
+        """Forwards the request to OpenWeatherMap and saves successful responses as fixtures."""
+        url = f"{self.upstream}?{urllib.parse.urlsplit(path).query}"
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        if status == 200:
+            with open(os.path.join(self.fixtures, fixture_name(query)), "wb") as file:
+                file.write(body)
+            with self._lock:
+                self.recorded += 1
+        return status, body
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict:
+        """Returns the counters of the stand-in."""
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "throttled": self.throttled, "recorded": self.recorded}
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    arg_parser.add_argument("--port", type=int, default=8081, help="Port to listen on")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Seconds every response is delayed")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="Additional random delay of up to this many seconds")
+    arg_parser.add_argument("--slow-share", type=float, default=0.0, help="Share of responses delayed by --slow-latency")
+    arg_parser.add_argument("--slow-latency", type=float, default=2.0, help="Delay in seconds of slow responses")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    arg_parser.add_argument("--calls-per-minute", type=int, help="Quota per minute, further calls get 429")
+    arg_parser.add_argument("--fixtures", help="Folder of recorded forecasts")
+    arg_parser.add_argument("--record", action="store_true", help="Forward to OpenWeatherMap and save the responses in --fixtures")
+    arg_parser.add_argument("--no-synthetic", action="store_true", help="Answer 404 for cities without a fixture")
+    arg_parser.add_argument("--seed", type=int, help="Seed of the random delays and errors")
+    args = arg_parser.parse_args()
+
+    stand_in = OWMStandIn(
+        latency=args.latency, jitter=args.jitter, slow_share=args.slow_share, slow_latency=args.slow_latency,
+        error_rate=args.error_rate, calls_per_minute=args.calls_per_minute, fixtures=args.fixtures,
+        record=args.record, synthetic=not args.no_synthetic, host=args.host, port=args.port, seed=args.seed,
+    )
+    print(f"OpenWeatherMap stand-in on {stand_in.url} (set OWM_BASE_URL to this URL)")
+    try:
+        stand_in.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.httpd.server_close()
+        print(stand_in.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Realistic Dialogflow ES webhook requests built from the agent in `google_dialogflow_es`.
+
+Every request comes from a training phrase of an intent that calls the webhook (the
+weather intent and its city, date, condition, temperature and wind speed followups).
+Annotated cities are kept, annotated dates are resolved to `@sys.date-time` values the
+way Dialogflow sends them, and custom entities are mapped to their reference value
+through the synonyms in `entities/`. Followups carry the `weather-check` context of a
+previous weather turn, as they do in a conversation.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import json
+import os
+import random
+import re
+
+AGENT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "google_dialogflow_es")
+SESSION = "projects/weather-chatbot/agent/sessions/benchmark"
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+def load_agent(path: str = AGENT_PATH):
+    """Returns the intents calling the webhook and the entity synonyms of the agent.
+
+    Returns:
+        tuple: List of intent dicts, and entity name -> {synonym: reference value}.
+    """
+    intents = []
+    for name in sorted(os.listdir(os.path.join(path, "intents"))):
+        with open(os.path.join(path, "intents", name), encoding="utf-8") as file:
+            intent = json.load(file)
+        if intent.get("webhookUsed") and intent.get("userSays"):
+            intents.append(intent)
+    entities = {}
+    for name in sorted(os.listdir(os.path.join(path, "entities"))):
+        with open(os.path.join(path, "entities", name), encoding="utf-8") as file:
+            entity = json.load(file)
+        entities[entity["name"]] = {
+            synonym.casefold(): entry["value"] for entry in entity["entries"] for synonym in entry["synonyms"]
+        }
+    return intents, entities
+
+def resolve_date(text: str, now: datetime):
+    """Resolves an annotated date like "next 3 days" or "tomorrow" to a `@sys.date-time` value."""
+    text = text.casefold()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def period(start: datetime, days: int) -> Dict:
+        end = start + timedelta(days=days, hours=23, minutes=59, seconds=59)
+        return {"startDate": start.isoformat(), "endDate": end.isoformat()}
+
+    if "weekend" in text:
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        return period(saturday, 1)
+    if "from now on" in text:
+        return period(today, 5)
+    count = re.search(r"\d+|" + "|".join(NUMBERS), text)
+    if count and ("day" in text or "next" in text):
+        days = int(count.group()) if count.group().isdigit() else NUMBERS[count.group()]
+        if "from now" in text:
+            return (today + timedelta(days=days)).replace(hour=12).isoformat()  # e.g. "three days from now"
+        return period(today, days - 1)  # e.g. "next 3 days"
+    for number, weekday in enumerate(WEEKDAYS):
+        if weekday in text:
+            return (today + timedelta(days=(number - today.weekday()) % 7)).replace(hour=12).isoformat()
+    if "tomorrow" in text:
+        return (today + timedelta(days=1)).replace(hour=12).isoformat()
+    return today.replace(hour=12).isoformat()
+
+class PayloadGenerator:
+    """Generates webhook requests from the training phrases of the agent."""
+
+    def __init__(self, path: str = AGENT_PATH, seed: Optional[int] = 0, followup_share: float = 0.4):
+        """Initialize the generator.
+
+        Args:
+            path (str): Folder of the exported Dialogflow agent.
+            seed (int, optional): Seed of the random choices, for reproducible runs.
+            followup_share (float): Share of the requests coming from followup intents.
+        """
+        self.intents, self.entities = load_agent(path)
+        self.random = random.Random(seed)
+        self.followup_share = followup_share
+        self.weather_intent = next(intent for intent in self.intents if not intent.get("contexts"))
+        self.followups = [intent for intent in self.intents if intent.get("contexts")]
+        self.cities = sorted({
+            segment["text"].strip(" ?!.") for intent in self.intents for phrase in intent["userSays"]
+            for segment in phrase["data"] if segment.get("alias") == "geo-city"
+        })
+
+    def __value(self, alias: str, meta: str, text: str, now: datetime):
+        """Returns the parameter value Dialogflow extracts from an annotated segment."""
+        if alias == "geo-city":
+            return text.strip(" ?!.")
+        if alias == "date-time":
+            return resolve_date(text, now)
+        synonyms = self.entities.get(meta.lstrip("@"), {})
+        value = synonyms.get(text.casefold())
+        # Annotations that are not a synonym still resolve to some value of the entity
+        return value if value is not None else self.random.choice(sorted(set(synonyms.values()) or [text]))
+
+    def __turn(self, intent: Dict, now: datetime):
+        """Returns the query text and parameters of a random training phrase of `intent`."""
+        phrase = self.random.choice(intent["userSays"])
+        parameters = {parameter["name"]: [] for parameter in intent["responses"][0]["parameters"]}
+        words = []
+        for segment in phrase["data"]:
+            alias = segment.get("alias")
+            if alias in parameters:
+                value = self.__value(alias, segment.get("meta", ""), segment["text"], now)
+                parameters[alias].append(value)
+            words.append(segment["text"])
+        return "".join(words), parameters
+
+    def generate(self, now: Optional[datetime] = None) -> Dict:
+        """Returns one webhook request."""
+        now = now or datetime.now().astimezone()
+        query_text, parameters = self.__turn(self.weather_intent, now)
+        # Both are required parameters of the weather intent, Dialogflow asks for them if missing
+        if not parameters["geo-city"]:
+            parameters["geo-city"] = [self.random.choice(self.cities)]
+        if not parameters["date-time"]:
+            parameters["date-time"] = [resolve_date("today", now)]
+        intent, contexts = self.weather_intent, []
+        if self.random.random() < self.followup_share:
+            # The followup is answered with the city and date of the previous weather turn
+            contexts = [{"name": f"{SESSION}/contexts/weather-check", "lifespanCount": 2, "parameters": parameters}]
+            intent = self.random.choice(self.followups)
+            query_text, parameters = self.__turn(intent, now)
+        return {
+            "responseId": f"benchmark-{self.random.getrandbits(32):08x}",
+            "session": SESSION,
+            "queryResult": {
+                "queryText": query_text,
+                "action": intent["responses"][0].get("action", ""),
+                "parameters": parameters,
+                "allRequiredParamsPresent": True,
+                "outputContexts": contexts,
+                "intent": {"displayName": intent["name"]},
+                "languageCode": "en",
+            },
+        }
+
+    def batch(self, count: int) -> List[Dict]:
+        """Returns `count` webhook requests."""
+        now = datetime.now().astimezone()
+        return [self.generate(now) for _ in range(count)]
@@ -0,0 +1,75 @@
+"""Upstream quota: interactive turns during a batch spike, with and without priorities.
+
+Warms the forecasts of a few regular cities and lets them expire, then sends a batch
+of new cities followed by webhook turns for new and regular cities, against a local
+stand-in that answers calls beyond its per-minute quota with 429. With the quota
+manager, batch queries stop at their reserve and turns that find no budget are
+answered with the expired forecast. Without it (a quota the stand-in can't enforce
+first), the batch spends the plan and the turns get whatever is left.
+
+The stand-in counts calls per clock minute, so a run crossing a minute boundary gets
+a fresh quota; rerun if the numbers look too good.
+
+Usage:
+    python -m benchmarks.quota --calls-per-minute 60 --batch 100 --turns 40
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from weather_condition.batch import BatchProcessor
+from weather_condition.dialog_handler import STALE_NOTE
+from weather_condition.forecast_cache import OWM_REFRESH_INTERVAL
+from weather_condition.fulfillment import FulfillmentResponse
+from weather_condition.quota import QuotaManager
+from weather_condition.weather import Weather
+from benchmarks.common import webhook_request
+from benchmarks.owm_standin import OWMStandIn
+
+def run(args, quota: QuotaManager) -> None:
+    """Replays the spike and prints how the batch and the turns were answered."""
+    regulars = [f"Regular {i}" for i in range(args.turns // 2)]
+    newcomers = [f"Newcomer {i}" for i in range(args.turns - len(regulars))]
+    with OWMStandIn(latency=0, calls_per_minute=args.calls_per_minute) as owm:
+        weather = Weather()
+        weather.base_url = owm.url
+        weather.quota = quota
+
+        # Regular cities were asked for before, their forecasts expire within a second
+        weather.forecast_cache.refresh_interval = 1
+        for city in regulars:
+            weather.get_forecast(city)
+        weather.forecast_cache.refresh_interval = OWM_REFRESH_INTERVAL
+        time.sleep(1.1)
+
+        batch = BatchProcessor(weather, max_queries=args.batch).process([{"city": f"Batch {i}"} for i in range(args.batch)])
+        batch_answered = sum("response" in result for result in batch["results"])
+
+        answers = {"fresh": 0, "stale": 0, "error": 0}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for city in newcomers + regulars:
+                response = weather.process_request(webhook_request(city))
+                if not isinstance(response, FulfillmentResponse):
+                    answers["error"] += 1
+                else:
+                    answers["stale" if STALE_NOTE in response.text else "fresh"] += 1
+        print(f"  batch answered:  {batch_answered} of {args.batch}")
+        print(f"  turns answered:  {answers['fresh']} fresh, {answers['stale']} stale, {answers['error']} errors of {args.turns}")
+        print(f"  upstream calls:  {owm.calls} ({owm.throttled} answered with 429)")
+        print(f"  quota denied:    {dict(quota.denied)}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--calls-per-minute", type=int, default=60, help="Quota of the stand-in and the quota manager")
+    arg_parser.add_argument("--batch", type=int, default=100, help="Cities in the batch spike")
+    arg_parser.add_argument("--turns", type=int, default=40, help="Webhook turns after the spike, half for regular cities")
+    args = arg_parser.parse_args()
+
+    print("with priorities:")
+    run(args, QuotaManager(args.calls_per_minute))
+    print("without (quota left to the stand-in):")
+    run(args, QuotaManager(10**9))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Rendered responses: identical turns with and without the response cache.
+
+Replays the same few questions (weather, a condition, temperature and wind speed for
+today and the next days in a handful of cities) through `Weather.process_request`
+and serializes every answer like the webhook does, once with the response cache and
+once without it. Checks that both answer alike, then refreshes one forecast and checks
+that its responses are rendered again.
+
+Usage:
+    python -m benchmarks.rendered --turns 20000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from weather_condition.quota import QuotaManager
+from weather_condition.weather import Weather
+from benchmarks.common import date_range, webhook_request
+from benchmarks.owm_standin import OWMStandIn
+
+CITIES = ("London", "Paris", "Berlin", "Madrid", "Rome")
+ATTRIBUTES = ({}, {"weather-condition": ["rain"]}, {"temperature": ["warm"]}, {"wind-speed": ["windy"]})
+
+def build_requests() -> list:
+    """Returns one webhook request per city, attribute and date range."""
+    return [
+        webhook_request(city, date_time, **attribute)
+        for city in CITIES for attribute in ATTRIBUTES for date_time in (None, date_range(2))
+    ]
+
+def replay(weather: Weather, requests: list, turns: int):
+    """Answers `turns` requests in a round robin, returns the seconds per turn and the last body of each request."""
+    bodies = [None] * len(requests)
+    start = time.perf_counter()
+    for turn in range(turns):
+        i = turn % len(requests)
+        bodies[i] = weather.process_request(requests[i]).to_json()
+    return (time.perf_counter() - start) / turns, bodies
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--turns", type=int, default=20000, help="Turns per measurement")
+    args = arg_parser.parse_args()
+
+    requests = build_requests()
+    with OWMStandIn(latency=0) as owm, contextlib.redirect_stdout(io.StringIO()):
+        weather = Weather()
+        weather.base_url = owm.url
+        weather.quota = QuotaManager(10**9)  # The stand-in has no quota
+        cache = weather.dialog_handler.response_cache
+
+        weather.dialog_handler.response_cache = None
+        uncached, expected = replay(weather, requests, args.turns)
+        weather.dialog_handler.response_cache = cache
+        cached, bodies = replay(weather, requests, args.turns)
+        mismatches = sum(1 for a, b in zip(expected, bodies) if a != b)
+
+        weather.refresh_forecast(CITIES[0])
+        replay(weather, requests, len(requests))
+        stats = cache.stats()
+
+    print(f"{len(requests)} distinct turns, {args.turns} turns per run:")
+    print(f"  without response cache: {uncached * 1e6:7.1f}µs per turn")
+    print(f"  with response cache:    {cached * 1e6:7.1f}µs per turn  ({uncached / cached:.1f}x)")
+    print(f"  different answers:      {mismatches}")
+    print(f"  after refreshing {CITIES[0]}:  {stats['invalidations']} responses rendered again (expected {len(requests) // len(CITIES)})")
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
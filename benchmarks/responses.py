@@ -0,0 +1,112 @@
+"""Fulfillment responses: the previous per-day envelope vs. the precompiled builder.
+
+The previous `format_weather_response` rebuilt the whole Dialogflow envelope for every
+day and the webhook serialized it with `jsonify`. The builder renders each day once,
+builds the envelope once and encodes only the text lines into the serialized envelope.
+Checks that both produce the same response and reports the time and the peak of
+allocated memory per response for 1-day and 6-day answers.
+
+Usage:
+    python -m benchmarks.responses --number 20000
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import time
+import tracemalloc
+
+from weather_condition.fulfillment import build_response
+
+def build_conditions(days: int) -> list:
+    """Returns the formatted forecast of `days` days, as the default formatter builds it."""
+    today = date.today()
+    return [
+        {
+            "date": (today + timedelta(days=day)).strftime("%A, %d %B %Y"),
+            "weather": "🌦️ light rain",
+            "temperature": f"🔽 {8.5 + day:.1f}°C → 🔼 {15.25 + day:.1f}°C",
+            "wind_speed": f"{3 + day % 3} m/s",
+        }
+        for day in range(days)
+    ]
+
+def previous_response(location: str, conditions: list) -> dict:
+    """The response as `format_weather_response` built it before the builder."""
+    forecast_texts = []
+    for day in conditions:
+        details = []
+        if day.get('date') and day.get('date') != "Unknown Date":
+            details.append(f"📅 {day['date']}")
+        if day.get('weather') and day.get('weather') != "Unknown":
+            details.append(f"⛅ Weather: {day['weather']}")
+        if day.get('temperature') and day.get('temperature') != "Unknown":
+            details.append(f"🌡️ Temperature: {day['temperature']}")
+        if day.get('wind_speed') and day.get('wind_speed') != "Unknown":
+            details.append(f"💨 Wind Speed: {day['wind_speed']}")
+        if details:
+            forecast_texts.append("\n".join(details))
+        response = {
+            "fulfillmentMessages": [
+                {
+                    "platform": "PLATFORM_UNSPECIFIED",
+                    "payload": {
+                        "richContent": [
+                            [
+                                {
+                                    "type": "description",
+                                    "title": "Weather Forecast",
+                                    "text": [f"📍 {location}", *forecast_texts],
+                                }
+                            ]
+                        ]
+                    }
+                }
+            ]
+        }
+    return response
+
+def previous(location: str, conditions: list) -> bytes:
+    """Previous response serialized like Flask's `jsonify` does."""
+    return json.dumps(previous_response(location, conditions), ensure_ascii=True, sort_keys=True).encode()
+
+def precompiled(location: str, conditions: list) -> bytes:
+    """Response of the builder serialized by itself."""
+    return build_response(location, conditions).to_json()
+
+def time_per_call(function, args, number: int) -> float:
+    """Returns the mean time of a call in seconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        function(*args)
+    return (time.perf_counter() - start) / number
+
+def peak_per_call(function, args) -> int:
+    """Returns the peak of memory allocated during one call in bytes."""
+    function(*args)
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--number", type=int, default=20000, help="Responses built per measurement")
+    args = arg_parser.parse_args()
+
+    for days in (1, 6):
+        conditions = build_conditions(days)
+        call = ("Bad Honnef", conditions)
+        # Same response and the same JSON document, up to key order and escaping
+        assert build_response(*call) == previous_response(*call)
+        assert json.loads(precompiled(*call)) == json.loads(previous(*call))
+
+        print(f"{days}-day answer:")
+        for name, function in (("previous + jsonify", previous), ("precompiled", precompiled)):
+            seconds = time_per_call(function, call, args.number)
+            peak = peak_per_call(function, call)
+            size = len(function(*call))
+            print(f"  {name:<20} {seconds * 1e6:7.2f}µs  peak {peak / 1024:6.1f} KiB  body {size:5d} bytes")
+
+if __name__ == "__main__":
+    main()
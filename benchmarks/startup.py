@@ -0,0 +1,63 @@
+"""Cold start of the webhook: import time and time to the first response.
+
+Starts fresh interpreters that import `app` and answer one Dialogflow turn against a
+local stand-in of the OpenWeatherMap API, and reports the median of the runs. With
+`--max-import-ms` the script fails if the import got slower, so it can guard against
+regressions in CI.
+
+Usage:
+    python -m benchmarks.startup --runs 10 --max-import-ms 400
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.owm_standin import OWMStandIn
+
+# Runs in the fresh interpreter; the timings are taken before anything else is imported
+CHILD = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from benchmarks.common import webhook_request
+app.weather.base_url = {url!r}
+response = app.app.test_client().post("/webhook", json=webhook_request("London"))
+assert response.status_code == 200, response.status_code
+answered = time.perf_counter()
+import json, sys
+print(json.dumps({{"import": imported - start, "first_response": answered - imported, "modules": len(sys.modules)}}))
+"""
+
+def run_once(url: str) -> dict:
+    """Starts one interpreter and returns its timings in seconds."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD.format(url=url)], capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start")
+    arg_parser.add_argument("--max-import-ms", type=float, help="Fail if the median import time is higher")
+    args = arg_parser.parse_args()
+
+    with OWMStandIn(latency=0) as server:
+        runs = [run_once(server.url) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import"] for run in runs) * 1000
+    first_ms = statistics.median(run["first_response"] for run in runs) * 1000
+    process_ms = statistics.median(run["process"] for run in runs) * 1000
+    print(f"import app:         {import_ms:7.1f}ms ({runs[0]['modules']} modules loaded after the first turn)")
+    print(f"first response:     {first_ms:7.1f}ms after the import")
+    print(f"whole process:      {process_ms:7.1f}ms including interpreter start and exit")
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        raise SystemExit(f"Import took {import_ms:.1f}ms, more than {args.max_import_ms:.1f}ms")
+
+if __name__ == "__main__":
+    main()
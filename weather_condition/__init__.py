@@ -4,19 +4,45 @@ __author__ = "Marius Kalder"
 __email__ = "aiweatherchatbot@mariuskalder.io"
 __status__ = "Production"
 
-import logging
+import importlib
 
-from .weather import Weather
-from .dialog_handler import DialogHandler
-from .date_handler import DateHandler
-from .precipitation import condition_emojis
+# Public names and the modules defining them. They are imported on first access, so
+# importing the package stays cheap and pulls in no third-party dependency.
+_exports = {
+    "Weather": ".weather",
+    "DialogHandler": ".dialog_handler",
+    "DateHandler": ".date_handler",
+    "condition_emojis": ".precipitation",
+    "RequestContext": ".request_context",
+    "DailySummary": ".daily_summary",
+    "ForecastSummary": ".daily_summary",
+    "CompactForecast": ".compact_forecast",
+    "BatchProcessor": ".batch",
+    "CityPopularity": ".prefetch",
+    "PrefetchScheduler": ".prefetch",
+    "ForecastStore": ".forecast_store",
+    "SharedForecastCache": ".shared_cache",
+    "ForecastCache": ".forecast_cache",
+    "ResponseCache": ".response_cache",
+    "SingleFlight": ".single_flight",
+    "OWMClient": ".owm_client",
+    "CircuitBreaker": ".owm_client",
+    "UpstreamError": ".owm_client",
+    "CircuitOpenError": ".owm_client",
+    "configure_logging": ".settings",
+    "FulfillmentResponse": ".fulfillment",
+    "CityIndex": ".city_index",
+    "ConditionIndex": ".condition_index",
+    "QuotaManager": ".quota",
+    "QuotaExceededError": ".quota",
+}
 
-logging.basicConfig(
-    filename='weather_query.log',  # Name of the log file
-    level=logging.INFO,  # Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',  # Log message format
-    datefmt='%Y-%m-%d %H:%M:%S'  # Date format
-)
+__all__ = list(_exports)
 
-logger = logging.getLogger(__name__)
-logger.info(f"Starting AI Weather Chatbot v{__version__} on {__date__}")
\ No newline at end of file
+def __getattr__(name: str):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
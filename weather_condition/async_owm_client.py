@@ -0,0 +1,146 @@
+from typing import Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp #type: ignore
+
+from .metrics import metrics
+from .owm_client import RETRY_STATUS_CODES, THROTTLED_STATUS_CODE, CircuitBreaker, CircuitOpenError, UpstreamError, decode_body
+
+class AsyncOWMClient:
+    """Non-blocking HTTP client for the OpenWeatherMap API based on aiohttp.
+
+    Mirrors `OWMClient`: pooled keep-alive connections, connect/read timeouts, jittered
+    retries of idempotent failures and a circuit breaker, without blocking the event loop.
+    """
+
+    def __init__(self, connect_timeout: float = 2.0, read_timeout: float = 3.0, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_max: float = 1.0, pool_size: int = 100,
+                 breaker: Optional[CircuitBreaker] = None):
+        """Initialize the client.
+
+        Args:
+            connect_timeout (float): Seconds to wait for the TCP/TLS connection.
+            read_timeout (float): Seconds to wait for the response.
+            max_retries (int): Retries after the first attempt for idempotent failures.
+            backoff_base (float): Base delay in seconds of the exponential backoff.
+            backoff_max (float): Upper bound in seconds of a single backoff delay.
+            pool_size (int): Maximum number of simultaneous connections.
+            breaker (CircuitBreaker, optional): Circuit breaker to use. Defaults to a new one.
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.session: Optional[aiohttp.ClientSession] = None  # Created on the running event loop
+        self.requests = 0  # Number of HTTP requests sent, including retries
+        self.retries = 0  # Number of retried attempts
+        self.failures = 0  # Number of calls that failed after all retries
+        self.rejected = 0  # Number of calls rejected by the open circuit breaker
+
+    def __backoff(self, attempt: int) -> float:
+        """Returns the delay before the next attempt using full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def __session(self) -> aiohttp.ClientSession:
+        """Returns the client session, creating it on first use."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def get(self, url: str, params: Dict, deadline: Optional[float] = None,
+                  acquire_retry: Optional[Callable[[], bool]] = None) -> Dict:
+        """Performs a GET request against the OpenWeatherMap API.
+
+        Args:
+            url (str): Endpoint to call.
+            params (dict): Query parameters of the request.
+            deadline (float, optional): `time.monotonic()` by which the call has to be done. The
+                                        timeouts are shortened and no retry is started after it.
+            acquire_retry (callable, optional): Asked before every retry, no retry is sent if it
+                                                returns False, e.g. because the quota is used up.
+
+        Returns:
+            dict: The decoded JSON response. Non-retryable error statuses
+            (e.g. 404 city not found) are returned to the caller unchanged.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            UpstreamError: If the call still failed after all retries, the deadline passed or
+                           OpenWeatherMap answered 429 (too many requests).
+        """
+        if deadline is not None and deadline <= time.monotonic():
+            raise UpstreamError("No time left to call OpenWeatherMap")
+        if not self.breaker.allow_request():
+            self.rejected += 1
+            raise CircuitOpenError("OpenWeatherMap circuit breaker is open")
+
+        session = self.__session()
+        # Drop unset parameters like `requests` does
+        params = {key: value for key, value in params.items() if value is not None}
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.__backoff(attempt - 1)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    break  # No time left for another attempt
+                if acquire_retry is not None and not acquire_retry():
+                    break  # No quota left for another attempt
+                self.retries += 1
+                await asyncio.sleep(delay)
+            timeout = self.timeout
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0.01)
+                timeout = aiohttp.ClientTimeout(total=remaining, sock_connect=min(self.connect_timeout, remaining),
+                                                sock_read=min(self.read_timeout, remaining))
+            self.requests += 1
+            try:
+                async with session.get(url, params=params, timeout=timeout) as response:
+                    metrics.increment("owm_responses_total", response.status)
+                    if response.status == THROTTLED_STATUS_CODE:
+                        self.failures += 1
+                        self.breaker.record_failure()
+                        raise UpstreamError("OpenWeatherMap returned 429, the quota of the API key is used up")
+                    if response.status in RETRY_STATUS_CODES:
+                        logging.warning("⚠️ OpenWeatherMap returned %s (attempt %d)", response.status, attempt + 1)
+                        error = UpstreamError(f"OpenWeatherMap returned {response.status}")
+                        continue
+                    data = decode_body(await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                metrics.increment("owm_responses_total", "error")
+                logging.warning("⚠️ OpenWeatherMap request failed (attempt %d): %r", attempt + 1, e)
+                error = e
+                continue
+            except (aiohttp.ClientError, ValueError) as e:
+                # Not safe to retry (e.g. an invalid URL or body)
+                self.failures += 1
+                self.breaker.record_failure()
+                raise UpstreamError(f"OpenWeatherMap request failed: {e}") from e
+            self.breaker.record_success()
+            return data
+
+        self.failures += 1
+        self.breaker.record_failure()
+        raise UpstreamError(f"OpenWeatherMap request failed: {error!r}") from error
+
+    async def close(self) -> None:
+        """Closes the pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+
+    def stats(self) -> Dict:
+        """Returns the client counters and circuit breaker state for monitoring."""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "circuit_breaker": self.breaker.stats(),
+        }
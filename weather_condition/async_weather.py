@@ -0,0 +1,123 @@
+from typing import Dict
+import asyncio
+import logging
+
+from .weather import Weather
+from .async_owm_client import AsyncOWMClient
+from .single_flight import AsyncSingleFlight
+from .quota import QuotaExceededError, INTERACTIVE
+from .metrics import metrics
+
+class AsyncWeather(Weather):
+    """Weather variant for asyncio servers.
+
+    Shares request parsing, date validation, caching and formatting with `Weather`, but
+    fetches forecasts with `AsyncOWMClient` so waiting on OpenWeatherMap never blocks the
+    event loop.
+    """
+
+    def __init__(self):
+        """Initialize the AsyncWeather class with an asynchronous upstream client."""
+        super().__init__()
+        self.async_client = AsyncOWMClient(breaker=self.owm_client.breaker) # Non-blocking HTTP client
+        self.async_single_flight = AsyncSingleFlight() # Shares one upstream call between concurrent coroutines
+        self._refreshes = set() # Background refreshes of stale forecasts
+
+    async def __fetch_weather_forecast_data(self, city: str, deadline=None, priority: str = INTERACTIVE):
+        """Fetches weather forecast data from OpenWeatherMap API without blocking.
+
+        With a deadline, an expired forecast of the city is served instead if OpenWeatherMap
+        doesn't answer before the deadline or fails, and the refresh goes on in the background.
+        An expired forecast is also served if the quota of the priority class is used up.
+
+        Args:
+            city (str): City for which to fetch the weather.
+            deadline (float, optional): `time.monotonic()` by which the forecast is needed.
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Returns:
+            tuple: The `CompactForecast`, and the seconds since it expired if a stale forecast was served, else None.
+        """
+        params, cache_key = self._forecast_request(city)
+
+        # Serve the forecast from the cache if the city was requested recently
+        cached = self._cached_forecast(cache_key)
+        if cached is not None:
+            return cached, None
+
+        async def request_forecast_data(deadline=None):
+            self._acquire_quota(cache_key, priority)
+            with metrics.stage("upstream_fetch"):
+                data = await self.async_client.get(self.base_url, params=params, deadline=deadline,
+                                                   acquire_retry=lambda: self._spend_quota(priority))
+            return self._store_forecast(cache_key, data)
+
+        stale = self.forecast_cache.get_stale(cache_key)
+        if stale is None or deadline is None:
+            # Perform GET request to fetch data, shared with concurrent requests for the same city
+            try:
+                return await self.async_single_flight.do(cache_key, lambda: request_forecast_data(deadline),
+                                                         timeout=self._remaining(deadline)), None
+            except QuotaExceededError:
+                if stale is None:
+                    raise
+                return self._serve_stale(cache_key, stale, "quota")
+
+        # Refresh in the background and wait for it only until the deadline
+        refresh = asyncio.ensure_future(self.async_single_flight.do(cache_key, request_forecast_data))
+        self._refreshes.add(refresh)  # Keeps the task alive after the turn is answered
+        refresh.add_done_callback(self.__refresh_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(refresh), self._remaining(deadline)), None
+        except asyncio.TimeoutError:
+            return self._serve_stale(cache_key, stale, "deadline")
+        except QuotaExceededError:
+            return self._serve_stale(cache_key, stale, "quota")
+        except Exception as e:
+            logging.warning("⚠️ Refreshing the forecast for %s failed: %s", cache_key[0], e)
+            return self._serve_stale(cache_key, stale, "error")
+
+    def __refresh_done(self, refresh: "asyncio.Future") -> None:
+        """Forgets a finished background refresh, its error was logged by the client."""
+        self._refreshes.discard(refresh)
+        if not refresh.cancelled():
+            refresh.exception()  # Retrieved, so asyncio doesn't report it again
+
+    async def process_request_async(self, request: Dict) -> Dict:
+        """Processes incoming weather queries on the event loop.
+
+        Same contract as `Weather.process_request`.
+
+        Args:
+            request (dict): The user's query request.
+
+        Returns:
+            dict: A dictionary containing the response to the user.
+        """
+        logging.debug("🔄 Request in progress…")
+        prepared = self._prepare_request(request)
+        if isinstance(prepared, dict):
+            return prepared  # Fallback response, e.g. missing city or invalid date
+        context, time = prepared
+
+        try:
+            # Fetch and format the weather data
+            logging.info("📡 Fetching weather for %s at %s", context.city, context.time)
+            data, stale_age = await self.__fetch_weather_forecast_data(context.city, context.deadline, context.priority)
+            speech = self.dialog_handler.format_forecast_output(context, time, data, stale=stale_age is not None)
+            logging.info("🔊 Response: %s", speech)
+            return speech
+        except Exception as e:
+            logging.error("⛔ Error Fetching Weather Data: %s", e)
+            return self.dialog_handler.handle_error()  # Handle general error
+
+    async def close(self) -> None:
+        """Closes the upstream connections."""
+        await self.async_client.close()
+
+    def stats(self) -> Dict:
+        """Returns the state of the forecast cache and the upstream clients for monitoring."""
+        stats = super().stats()
+        stats["async_single_flight"] = self.async_single_flight.stats()
+        stats["async_owm_client"] = self.async_client.stats()
+        return stats
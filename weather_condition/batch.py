@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import logging
+
+from .request_context import RequestContext
+from .quota import BATCH
+
+# Attribute of a batch query -> field of the request context the formatters read
+ATTRIBUTES = {
+    "weather": None,
+    "condition": "condition",
+    "temperature": "temperature",
+    "wind_speed": "wind_speed",
+}
+
+class BatchProcessor:
+    """Answers many forecast queries in one call.
+
+    Forecasts of all distinct cities are fetched concurrently on a bounded worker pool,
+    through the cache and upstream client of `Weather`, and every query is then formatted
+    with `DialogHandler`. A failing query yields an error entry instead of failing the batch.
+    """
+
+    def __init__(self, weather, max_workers: int = 8, max_queries: int = 100):
+        """Initialize the batch processor.
+
+        Args:
+            weather (Weather): Weather instance used to fetch, validate and format forecasts.
+            max_workers (int): Maximum number of concurrent upstream fetches.
+            max_queries (int): Maximum number of queries accepted in one batch.
+        """
+        self.weather = weather
+        self.max_queries = max_queries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-fetch")
+
+    def __fetch_all(self, cities: List[str]) -> Dict:
+        """Fetches the forecasts of all cities concurrently.
+
+        Returns:
+            dict: City -> forecast, or the exception raised while fetching it.
+        """
+        futures = {city: self.executor.submit(self.weather.get_forecast, city, BATCH) for city in cities}
+        forecasts = {}
+        for city, future in futures.items():
+            try:
+                forecasts[city] = future.result()
+            except Exception as e:
+                logging.error("⛔ Error Fetching Weather Data for %s: %s", city, e)
+                forecasts[city] = e
+        return forecasts
+
+    def __validate(self, query: Dict):
+        """Validates the city, attribute and date range of a single query.
+
+        Args:
+            query (dict): The query with `city`, optional `date`, `attribute` and `values`.
+
+        Returns:
+            tuple: The validated time range, or None and an error message.
+        """
+        city = query.get("city")
+        if not isinstance(city, str) or not city.strip():
+            return None, "Missing city"
+        attribute = query.get("attribute", "weather")
+        if attribute not in ATTRIBUTES:
+            return None, f"Unknown attribute, expected one of {', '.join(ATTRIBUTES)}"
+        if attribute == "condition":
+            # The condition formatter matches the requested conditions, there is no default
+            values = query.get("values")
+            if not isinstance(values, list) or not values or not all(isinstance(value, str) and value.strip() for value in values):
+                return None, "A condition query needs the conditions to look for in values, e.g. [\"rain\"]"
+
+        date = query.get("date")
+        if date is not None and not isinstance(date, str):
+            # Anything else would be read as today by `check_date_range`
+            return None, "The date has to be a string, e.g. \"2025-02-24\""
+
+        time = self.weather.date_handler.check_date_range(date)
+        if time is True:
+            return None, "The start date is in the past"
+        if time is False:
+            return None, "The end date is more than 5 days from today"
+        if not isinstance(time, tuple):
+            return None, "Invalid date"
+        return time, None
+
+    def __answer(self, query: Dict, time, forecasts: Dict) -> Dict:
+        """Formats a single validated query.
+
+        Args:
+            query (dict): The query with `city`, optional `date`, `attribute` and `values`.
+            time (tuple): The validated time range of the query.
+            forecasts (dict): City -> forecast or fetch error.
+
+        Returns:
+            dict: The query's result with either a `response` or an `error`.
+        """
+        city = query["city"]
+        attribute = query.get("attribute", "weather")
+        result = {"city": city, "date": query.get("date"), "attribute": attribute}
+
+        forecast = forecasts[city]
+        if isinstance(forecast, Exception):
+            result["error"] = f"Could not fetch the weather: {forecast}"
+            return result
+
+        options = {}
+        if ATTRIBUTES[attribute]:
+            options[ATTRIBUTES[attribute]] = query.get("values") or [attribute]
+        context = RequestContext(result={}, query_text=None, action="batch", parameters=query, city=city, time=query.get("date"), **options)
+        try:
+            result["response"] = self.weather.dialog_handler.format_forecast_output(context, time, forecast)
+        except Exception as e:
+            logging.error("⛔ Error Formatting Weather Data for %s: %s", city, e)
+            result["error"] = "Could not format the forecast"
+        return result
+
+    def process(self, queries: List[Dict]) -> Dict:
+        """Answers a batch of forecast queries.
+
+        Args:
+            queries (list): Queries of the form
+                {"city": "London", "date": "2025-02-24", "attribute": "condition", "values": ["rain"]}.
+                `date` accepts the same formats as the Dialogflow `date-time` parameter and
+                defaults to today, `attribute` is one of weather, condition, temperature or wind_speed.
+
+        Returns:
+            dict: The results in the order of the queries.
+
+        Raises:
+            ValueError: If the batch is empty, too large or a query is not an object.
+        """
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("Expected a non-empty list of queries")
+        if len(queries) > self.max_queries:
+            raise ValueError(f"At most {self.max_queries} queries are allowed per batch")
+        if not all(isinstance(query, dict) for query in queries):
+            raise ValueError("Every query must be an object")
+
+        logging.info("📦 Processing batch of %d queries", len(queries))
+        validated = [self.__validate(query) for query in queries]
+
+        # Only fetch the cities of valid queries, each city once
+        cities = list(dict.fromkeys(query["city"] for query, (time, error) in zip(queries, validated) if error is None))
+        forecasts = self.__fetch_all(cities)
+
+        results = []
+        for query, (time, error) in zip(queries, validated):
+            if error is not None:
+                results.append({"city": query.get("city"), "date": query.get("date"), "attribute": query.get("attribute", "weather"), "error": error})
+            else:
+                results.append(self.__answer(query, time, forecasts))
+        return {"results": results}
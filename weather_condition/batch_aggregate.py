@@ -0,0 +1,160 @@
+from typing import Dict, List, Sequence
+import time
+
+try:
+    import numpy as np #type: ignore
+except ImportError:  # numpy is only needed for batch aggregation
+    np = None
+
+from .compact_forecast import CompactForecast
+
+SLOT_SECONDS = 3 * 60 * 60  # OpenWeatherMap forecast slots are 3 hours apart
+SLOTS_PER_DAY = 24 * 60 * 60 // SLOT_SECONDS
+
+class BatchSummary:
+    """Daily statistics of many cities computed at once, as (city × day) arrays.
+
+    Day `d` of city `c` is valid if `valid[c, d]` is set; its date is `first_day[c] + d`
+    days since the epoch. The values match the fields of `DailySummary`.
+    """
+
+    def __init__(self, first_day, valid, temp_min, temp_max, wind_min, wind_max, wind_mode, weather_code, weather_titles):
+        self.first_day = first_day  # (cities,) day number of the first day since the epoch
+        self.valid = valid  # (cities, days) True if the day has forecast slots
+        self.temp_min = temp_min  # (cities, days) lowest temperature
+        self.temp_max = temp_max  # (cities, days) highest temperature
+        self.wind_min = wind_min  # (cities, days) lowest wind speed
+        self.wind_max = wind_max  # (cities, days) highest wind speed
+        self.wind_mode = wind_mode  # (cities, days) most common wind speed
+        self.weather_code = weather_code  # (cities, days) index into `weather_titles` of the most common description
+        self.weather_titles = weather_titles  # Title case weather descriptions
+
+    def __len__(self) -> int:
+        """Returns the number of cities."""
+        return len(self.first_day)
+
+    def days(self, city: int) -> Dict[str, Dict]:
+        """Returns the daily statistics of a city keyed by date (YYYY-MM-DD).
+
+        Args:
+            city (int): Index of the city in the aggregated batch.
+
+        Returns:
+            dict: Date -> dict with the `DailySummary` fields temp_min, temp_max,
+                  wind_min, wind_max, wind_mode and weather.
+        """
+        days = {}
+        for d in np.flatnonzero(self.valid[city]):
+            date = time.strftime("%Y-%m-%d", time.gmtime(int(self.first_day[city] + d) * 86400))
+            days[date] = {
+                "temp_min": float(self.temp_min[city, d]),
+                "temp_max": float(self.temp_max[city, d]),
+                "wind_min": float(self.wind_min[city, d]),
+                "wind_max": float(self.wind_max[city, d]),
+                "wind_mode": float(self.wind_mode[city, d]),
+                "weather": self.weather_titles[self.weather_code[city, d]],
+            }
+        return days
+
+def _first_mode(values, valid):
+    """Returns the most common value along the last axis, ties going to the value seen first.
+
+    This is the result of `Counter(values).most_common(1)` for every row, computed with
+    a pairwise comparison of the (at most 8) slots of a day.
+    """
+    equal = (values[..., :, None] == values[..., None, :]) & valid[..., None, :] & valid[..., :, None]
+    counts = equal.sum(axis=-1)
+    # argmax returns the first slot with the highest count, which is the first occurrence of that value
+    first = counts.argmax(axis=-1)
+    return np.take_along_axis(values, first[..., None], axis=-1)[..., 0]
+
+def aggregate_daily(forecasts: Sequence[CompactForecast], local_time: bool = False) -> BatchSummary:
+    """Computes the daily statistics of many forecasts with vectorized reductions.
+
+    The forecasts are laid out on a (city × day × 3 hour slot) grid, so min/max and the
+    modal wind speed and weather description are reductions over the last axis.
+
+    Args:
+        forecasts (list): Forecasts of the cities to aggregate.
+        local_time (bool): Group slots by the local day of each city instead of the UTC day.
+            The default matches the grouping used by `DialogHandler`.
+
+    Returns:
+        BatchSummary: The daily statistics of all cities.
+
+    Raises:
+        ImportError: If numpy is not installed.
+        ValueError: If a forecast slot is not on the 3 hour grid of OpenWeatherMap.
+    """
+    if np is None:
+        raise ImportError("Batch aggregation requires numpy: pip install -r requirements-batch.txt")
+
+    cities = len(forecasts)
+    slots = max((len(forecast) for forecast in forecasts), default=0)
+
+    # Stack the columns into (city × slot) arrays, padding shorter forecasts
+    dt = np.zeros((cities, slots), dtype=np.int64)
+    offset = np.zeros(cities, dtype=np.int64)  # Shift of the local day from UTC of every city
+    temp = np.zeros((cities, slots))
+    wind = np.zeros((cities, slots))
+    code = np.zeros((cities, slots), dtype=np.int64)
+    present = np.zeros((cities, slots), dtype=bool)
+    titles: Dict[str, int] = {}
+    for c, forecast in enumerate(forecasts):
+        n = len(forecast)
+        if local_time:
+            offset[c] = forecast.timezone
+        dt[c, :n] = np.frombuffer(forecast.dt, dtype=np.int64)
+        temp[c, :n] = np.frombuffer(forecast.temp, dtype=np.float64)
+        wind[c, :n] = np.frombuffer(forecast.wind_speed, dtype=np.float64)
+        # Descriptions are compared in title case like the scalar formatter does
+        description_codes = np.array([titles.setdefault(d.title(), len(titles)) for d in forecast.descriptions], dtype=np.int64)
+        if n:
+            code[c, :n] = description_codes[np.frombuffer(forecast.description_index, dtype=np.uint8)]
+        present[c, :n] = True
+
+    if np.any(dt[present] % SLOT_SECONDS):
+        raise ValueError("Forecast slots must be on the 3 hour grid")
+
+    # Place every slot on the (city × day × slot of day) grid. The grid is checked on UTC,
+    # local days start at any offset, so slots are numbered within their day instead
+    day_number = (dt + offset[:, None]) // 86400
+    no_day = np.iinfo(np.int64).max
+    first_day = np.where(present, day_number, no_day).min(axis=1, initial=no_day)
+    first_day[~present.any(axis=1)] = 0
+    day = np.where(present, day_number - first_day[:, None], 0)
+    days = int(day.max(initial=-1)) + 1
+    # Slots are sorted and 3 hours apart, so a day has at most SLOTS_PER_DAY of them
+    slot_index = np.broadcast_to(np.arange(slots), (cities, slots))
+    new_day = np.ones((cities, slots), dtype=bool)
+    new_day[:, 1:] = day_number[:, 1:] != day_number[:, :-1]
+    day_start = np.maximum.accumulate(np.where(new_day, slot_index, 0), axis=1)
+    slot_of_day = slot_index - day_start
+
+    shape = (cities, days, SLOTS_PER_DAY)
+    grid_valid = np.zeros(shape, dtype=bool)
+    grid_temp = np.full(shape, np.nan)
+    grid_wind = np.full(shape, np.nan)
+    grid_code = np.full(shape, -1, dtype=np.int64)
+    c_index, s_index = np.nonzero(present)
+    target = (c_index, day[c_index, s_index], slot_of_day[c_index, s_index])
+    grid_valid[target] = True
+    grid_temp[target] = temp[c_index, s_index]
+    grid_wind[target] = wind[c_index, s_index]
+    grid_code[target] = code[c_index, s_index]
+
+    valid = grid_valid.any(axis=-1)
+    with np.errstate(invalid="ignore"):
+        temp_min = np.where(grid_valid, grid_temp, np.inf).min(axis=-1)
+        temp_max = np.where(grid_valid, grid_temp, -np.inf).max(axis=-1)
+        wind_min = np.where(grid_valid, grid_wind, np.inf).min(axis=-1)
+        wind_max = np.where(grid_valid, grid_wind, -np.inf).max(axis=-1)
+
+    # Invalid slots never win the mode, they are excluded from the pairwise counts
+    wind_mode = _first_mode(np.where(grid_valid, grid_wind, 0.0), grid_valid)
+    weather_code = _first_mode(grid_code, grid_valid)
+
+    weather_titles: List[str] = [None] * len(titles)
+    for title, index in titles.items():
+        weather_titles[index] = title
+    return BatchSummary(first_day, valid, temp_min, temp_max, wind_min, wind_max, wind_mode, weather_code, weather_titles)
@@ -0,0 +1,246 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+
+# Common short and alternative names of cities -> the name OpenWeatherMap knows them by
+ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "san fran": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "washington d c": "washington",
+    "vegas": "las vegas",
+    "philly": "philadelphia",
+    "rio": "rio de janeiro",
+    "st petersburg": "saint petersburg",
+    "frankfurt": "frankfurt am main",
+    "the hague": "den haag",
+    "hk": "hong kong",
+    "kl": "kuala lumpur",
+}
+
+# Version of the compiled index file, bump when its layout changes
+INDEX_VERSION = 1
+
+@lru_cache(maxsize=4096)
+def normalize_city(name: str) -> str:
+    """Normalizes a city name for lookups: case, accents, dots and whitespace are ignored.
+
+    Example:
+        normalize_city("  St. Pölten ") == "st polten"
+    """
+    stripped = name
+    if not name.isascii():
+        decomposed = unicodedata.normalize("NFKD", name)
+        stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.replace(".", " ").split()).casefold()
+
+def name_hash(name: str) -> int:
+    """Returns the 64 bit hash of a normalized name, stable across processes."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+@dataclass(frozen=True)
+class ResolvedCity:
+    """A city name resolved for a forecast request."""
+
+    key: str  # Normalized name the forecast is cached under, the same for all aliases
+    query: str  # Name sent as `q` if the city id is unknown
+    city_id: Optional[int] = None  # OpenWeatherMap city id, if the name is unique in the city list
+    lat: Optional[float] = None  # Latitude of the city
+    lon: Optional[float] = None  # Longitude of the city
+
+class CityIndex:
+    """Resolves city names locally, before OpenWeatherMap is asked.
+
+    Names are normalized and mapped through an alias table, so "NYC", "New York" and
+    "new york city" are one city. With a bulk city list of OpenWeatherMap
+    (`city.list.json.gz` from https://bulk.openweathermap.org/sample/), names that are
+    unique in the list resolve to their city id and coordinates. The list is compiled to
+    sorted hash and column arrays next to it on first use, so later starts only read
+    those. The list is loaded in a background thread, until it is ready names are sent
+    to OpenWeatherMap unresolved. Names OpenWeatherMap rejected are kept in a bounded negative cache and are
+    not asked for again until they expire.
+    """
+
+    def __init__(self, path: Optional[str] = None, aliases: Optional[Dict[str, str]] = None,
+                 max_rejected: int = 1024, rejected_ttl: float = 24 * 60 * 60):
+        """Initialize the city index.
+
+        Args:
+            path (str, optional): OpenWeatherMap city list, JSON or gzipped JSON. Without it only
+                                  aliases and the negative cache are used.
+            aliases (dict, optional): Additional aliases, name -> name known to OpenWeatherMap.
+            max_rejected (int): Maximum number of rejected names remembered.
+            rejected_ttl (float): Seconds a rejected name is not asked for again.
+        """
+        self.path = path
+        self.aliases = {normalize_city(alias): name for alias, name in {**ALIASES, **(aliases or {})}.items()}
+        self.max_rejected = max_rejected
+        self.rejected_ttl = rejected_ttl
+        self._rejected = OrderedDict()  # Normalized name -> time until it is rejected without a request
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Held while the city list is read, apart from `_lock` so lookups never wait on it
+        self._loader = None  # Thread loading the city list
+        self._columns = None  # Sorted name hashes, city ids (0 if ambiguous), latitudes and longitudes
+        if not path:
+            self._columns = (array("Q"), array("I"), array("d"), array("d"))
+        self.resolved = 0  # Names resolved to a city id
+        self.rejections = 0  # Lookups answered by the negative cache
+
+    def load(self) -> Tuple[array, array, array, array]:
+        """Returns the columns of the city list, compiling the list first if needed.
+
+        Blocks until the list is loaded, see `load_in_background` for request threads.
+        """
+        if self._columns is None:
+            with self._load_lock:
+                if self._columns is None:
+                    started = time.perf_counter()
+                    try:
+                        columns = self.__read_compiled() or self.__compile()
+                    except (OSError, ValueError, KeyError) as e:
+                        logging.error("⛔ Could not load the city list %s: %s", self.path, e)
+                        columns = (array("Q"), array("I"), array("d"), array("d"))
+                    logging.info("🏙️ Loaded %d city names from %s in %.2fs", len(columns[0]), self.path, time.perf_counter() - started)
+                    self._columns = columns
+        return self._columns
+
+    def load_in_background(self) -> None:
+        """Starts loading the city list in a background thread, if it isn't loaded yet."""
+        with self._lock:
+            if self._columns is not None or self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self.load, name="city-index", daemon=True)
+        self._loader.start()
+
+    def __read_compiled(self):
+        """Reads the compiled index if it is newer than the city list."""
+        compiled = self.path + ".idx"
+        try:
+            if os.path.getmtime(compiled) < os.path.getmtime(self.path):
+                return None
+            with open(compiled, "rb") as file:
+                header = json.loads(file.readline())
+                if header.get("version") != INDEX_VERSION:
+                    return None
+                columns = (array("Q"), array("I"), array("d"), array("d"))
+                for column in columns:
+                    column.fromfile(file, header["entries"])
+            return columns
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def __compile(self):
+        """Builds the columns from the city list and saves them next to it."""
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as file:
+            cities = json.load(file)
+        rows = {}  # Name hash -> (city id or 0 if several cities have this name, lat, lon)
+        for city in cities:
+            coord = city.get("coord", {})
+            name = name_hash(normalize_city(city["name"]))
+            row = (city["id"], coord.get("lat", 0.0), coord.get("lon", 0.0))
+            rows[name] = (0, 0.0, 0.0) if name in rows and rows[name][0] != row[0] else row
+        hashes = sorted(rows)
+        columns = (
+            array("Q", hashes),
+            array("I", (rows[name][0] for name in hashes)),
+            array("d", (rows[name][1] for name in hashes)),
+            array("d", (rows[name][2] for name in hashes)),
+        )
+        try:
+            with open(self.path + ".idx", "wb") as file:
+                file.write(json.dumps({"version": INDEX_VERSION, "entries": len(hashes)}).encode() + b"\n")
+                for column in columns:
+                    column.tofile(file)
+        except OSError as e:
+            logging.warning("⚠️ Could not save the compiled city index: %s", e)
+        return columns
+
+    def __name(self, city: str) -> Tuple[str, str]:
+        """Returns the normalized key and the query name of a city, through the aliases."""
+        key = normalize_city(city)
+        alias = self.aliases.get(key)
+        if alias is not None:
+            return normalize_city(alias), alias
+        return key, city.strip()
+
+    def known_key(self, city: str) -> Optional[str]:
+        """Returns the normalized key of a city name, or None if OpenWeatherMap rejected it recently.
+
+        Unlike `resolve` and `is_rejected` the lookup isn't counted and never loads the city list.
+        """
+        key = self.__name(city)[0]
+        with self._lock:
+            expires_at = self._rejected.get(key)
+        return key if expires_at is None or expires_at <= time.monotonic() else None
+
+    def resolve(self, city: str) -> ResolvedCity:
+        """Resolves a city name as sent by Dialogflow.
+
+        Args:
+            city (str): The city name.
+
+        Returns:
+            ResolvedCity: The cache key, and the city id if the name is unique in the city list.
+        """
+        key, query = self.__name(city)
+        columns = self._columns
+        if columns is None:
+            # Until the list is loaded the name is sent as is, turns don't wait for it
+            self.load_in_background()
+            return ResolvedCity(key, query)
+        hashes, ids, lats, lons = columns
+        if hashes:
+            target = name_hash(key)
+            row = bisect_left(hashes, target)
+            if row < len(hashes) and hashes[row] == target and ids[row]:
+                self.resolved += 1
+                return ResolvedCity(key, query, ids[row], lats[row], lons[row])
+        return ResolvedCity(key, query)
+
+    def reject(self, key: str) -> None:
+        """Remembers that OpenWeatherMap doesn't know the city with this normalized name."""
+        with self._lock:
+            self._rejected[key] = time.monotonic() + self.rejected_ttl
+            self._rejected.move_to_end(key)
+            while len(self._rejected) > self.max_rejected:
+                self._rejected.popitem(last=False)
+
+    def is_rejected(self, key: str) -> bool:
+        """Returns True if OpenWeatherMap rejected the city recently."""
+        with self._lock:
+            expires_at = self._rejected.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._rejected[key]
+                return False
+            self.rejections += 1
+            return True
+
+    def stats(self) -> Dict:
+        """Returns the size and counters of the index for monitoring."""
+        with self._lock:
+            return {
+                "cities": len(self._columns[0]) if self._columns is not None else None,
+                "aliases": len(self.aliases),
+                "rejected": len(self._rejected),
+                "resolved": self.resolved,
+                "rejections": self.rejections,
+            }
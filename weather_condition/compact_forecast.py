@@ -0,0 +1,150 @@
+from array import array
+from typing import Dict, Optional
+import json
+import sys
+
+from .daily_summary import ForecastSummary
+from .metrics import metrics
+
+class CompactForecast:
+    """Columnar representation of an OpenWeatherMap 5 day / 3 hour forecast.
+
+    Only the fields used by the chatbot are kept. The 3 hour slots are stored in
+    `array` columns instead of ~40 nested dicts per city, and weather descriptions are
+    interned and referenced by index, which keeps cached cities small and cheap for the GC.
+    """
+
+    __slots__ = (
+        "city_name",  # City name reported by OpenWeatherMap
+        "city_id",  # OpenWeatherMap city id
+        "lat",  # Latitude of the city
+        "lon",  # Longitude of the city
+        "timezone",  # Shift in seconds from UTC
+        "dt",  # Unix time of every slot
+        "temp",  # Temperature of every slot
+        "wind_speed",  # Wind speed of every slot
+        "weather_id",  # OpenWeatherMap weather condition code of every slot
+        "description_index",  # Index into `descriptions` of every slot
+        "descriptions",  # Distinct weather descriptions in order of appearance
+        "_summary",  # Daily summaries, built on first use
+    )
+
+    def __init__(self, city_name: str, city_id: Optional[int] = None, lat: Optional[float] = None,
+                 lon: Optional[float] = None, timezone: int = 0):
+        """Initialize an empty forecast for a city.
+
+        Args:
+            city_name (str): City name reported by OpenWeatherMap.
+            city_id (int, optional): OpenWeatherMap city id.
+            lat (float, optional): Latitude of the city.
+            lon (float, optional): Longitude of the city.
+            timezone (int): Shift in seconds from UTC.
+        """
+        self.city_name = city_name
+        self.city_id = city_id
+        self.lat = lat
+        self.lon = lon
+        self.timezone = timezone
+        self.dt = array("q")
+        self.temp = array("d")
+        self.wind_speed = array("d")
+        self.weather_id = array("H")
+        self.description_index = array("B")
+        self.descriptions = ()
+        self._summary = None
+
+    @classmethod
+    def from_owm(cls, forecast_data: Dict) -> "CompactForecast":
+        """Builds the compact forecast from a forecast returned by the OpenWeatherMap API.
+
+        Args:
+            forecast_data (dict): A dictionary of forecast data returned from the OpenWeatherMap API.
+
+        Returns:
+            CompactForecast: The forecast in columnar form.
+        """
+        city = forecast_data["city"]
+        coord = city.get("coord", {})
+        forecast = cls(city["name"], city.get("id"), coord.get("lat"), coord.get("lon"), city.get("timezone", 0))
+
+        descriptions = {}
+        for entry in forecast_data["list"]:
+            weather = entry["weather"][0]
+            description = weather["description"]
+            index = descriptions.get(description)
+            if index is None:
+                index = descriptions[description] = len(descriptions)
+            forecast.dt.append(entry["dt"])
+            forecast.temp.append(entry["main"]["temp"])
+            forecast.wind_speed.append(entry["wind"]["speed"])
+            forecast.weather_id.append(weather.get("id", 0))
+            forecast.description_index.append(index)
+        forecast.descriptions = tuple(sys.intern(description) for description in descriptions)
+        return forecast
+
+    def __len__(self) -> int:
+        """Returns the number of 3 hour slots."""
+        return len(self.dt)
+
+    @property
+    def first_slot(self) -> Optional[int]:
+        """Unix time of the first slot, or None if the forecast is empty."""
+        return self.dt[0] if self.dt else None
+
+    def description(self, slot: int) -> str:
+        """Returns the weather description of a slot."""
+        return self.descriptions[self.description_index[slot]]
+
+    def to_bytes(self) -> bytes:
+        """Serializes the forecast, e.g. to persist or share it between processes.
+
+        The header is stored as a JSON line followed by the raw column arrays in the
+        byte order of the host.
+
+        Returns:
+            bytes: The serialized forecast.
+        """
+        header = {
+            "city_name": self.city_name,
+            "city_id": self.city_id,
+            "lat": self.lat,
+            "lon": self.lon,
+            "timezone": self.timezone,
+            "descriptions": self.descriptions,
+            "slots": len(self.dt),
+        }
+        return b"".join((
+            json.dumps(header, separators=(",", ":")).encode(), b"\n",
+            self.dt.tobytes(), self.temp.tobytes(), self.wind_speed.tobytes(),
+            self.weather_id.tobytes(), self.description_index.tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactForecast":
+        """Restores a forecast serialized with `to_bytes`.
+
+        Args:
+            data (bytes): The serialized forecast.
+
+        Returns:
+            CompactForecast: The forecast in columnar form.
+        """
+        end = data.index(b"\n")
+        header = json.loads(data[:end])
+        forecast = cls(header["city_name"], header["city_id"], header["lat"], header["lon"], header["timezone"])
+        forecast.descriptions = tuple(sys.intern(description) for description in header["descriptions"])
+        offset = end + 1
+        slots = header["slots"]
+        for column in (forecast.dt, forecast.temp, forecast.wind_speed, forecast.weather_id, forecast.description_index):
+            size = slots * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        return forecast
+
+    @property
+    def summary(self) -> ForecastSummary:
+        """Daily summaries of the forecast, built once on first use."""
+        if self._summary is None:
+            with metrics.stage("daily_grouping"):
+                self._summary = ForecastSummary.from_compact(self)
+        return self._summary
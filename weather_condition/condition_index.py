@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+import json
+import logging
+import os
+
+# Synonyms of the `weather-condition` entity of the Dialogflow agent
+ENTITY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "google_dialogflow_es", "entities", "weather-condition.json",
+)
+
+# OpenWeatherMap weather condition codes and the values of the `weather-condition` entity they stand for,
+# see https://openweathermap.org/weather-conditions
+CODE_CONDITIONS = (
+    (range(200, 300), ("thunderstorm", "storm")),
+    (range(300, 400), ("drizzle",)),
+    (range(500, 600), ("rain",)),
+    (range(511, 512), ("freezing rain", "ice")),
+    (range(520, 532), ("shower",)),
+    (range(600, 700), ("snow",)),
+    (range(611, 617), ("rain snow",)),
+    (range(620, 623), ("shower",)),
+    (range(701, 702), ("mist", "fog")),
+    (range(711, 712), ("smoke",)),
+    (range(721, 722), ("haze",)),
+    (range(731, 732), ("sand", "dust")),
+    (range(741, 742), ("fog", "mist")),
+    (range(751, 752), ("sand",)),
+    (range(761, 762), ("dust",)),
+    (range(762, 763), ("ash", "volcano eruption")),
+    (range(771, 772), ("squall",)),
+    (range(781, 782), ("tornadoes", "storm")),
+    (range(800, 801), ("clear", "sun")),
+    (range(801, 805), ("clouds",)),
+    (range(804, 805), ("overcast",)),
+)
+
+class ConditionIndex:
+    """Maps weather conditions to bits, so matching a forecast against them is a mask test.
+
+    Every value of the `weather-condition` entity gets one bit. A 3 hour slot's mask has
+    the bits of the values its OpenWeatherMap code stands for and of the values whose
+    synonyms appear in its description, e.g. 500 "light rain" -> rain. Requested
+    conditions resolve to a mask through the same synonyms.
+    """
+
+    def __init__(self, entries: Dict[str, List[str]]):
+        """Initialize the index.
+
+        Args:
+            entries (dict): Value of the entity -> its synonyms.
+        """
+        self.bits = {value: 1 << bit for bit, value in enumerate(entries)}
+        self.synonyms = {}  # Lower case synonym -> value
+        for value, synonyms in entries.items():
+            for synonym in (value, *synonyms):
+                self.synonyms.setdefault(synonym.lower(), value)
+        self.code_masks = {}  # OpenWeatherMap condition code -> mask
+        for codes, values in CODE_CONDITIONS:
+            mask = self.mask_of(values)
+            for code in codes:
+                self.code_masks[code] = self.code_masks.get(code, 0) | mask
+        self._description_masks = {}  # Weather description -> mask, filled on first use
+
+    @classmethod
+    def from_entity(cls, path: str = ENTITY_PATH) -> "ConditionIndex":
+        """Builds the index from an exported Dialogflow entity.
+
+        Without the file, only the values used by `CODE_CONDITIONS` are known, without synonyms.
+        """
+        try:
+            with open(path, encoding="utf-8") as file:
+                entity = json.load(file)
+        except OSError:
+            logging.warning("⚠️ %s not found, matching weather conditions without synonyms", path)
+            return cls({value: [] for _, values in CODE_CONDITIONS for value in values})
+        return cls({entry["value"]: entry["synonyms"] for entry in entity["entries"]})
+
+    def mask_of(self, values: Iterable[str]) -> int:
+        """Returns the mask of entity values, unknown values have no bit."""
+        mask = 0
+        for value in values:
+            mask |= self.bits.get(value, 0)
+        return mask
+
+    def description_mask(self, description: str) -> int:
+        """Returns the mask of the values whose synonyms appear in a weather description."""
+        mask = self._description_masks.get(description)
+        if mask is None:
+            lower = description.lower()
+            mask = self.mask_of(value for synonym, value in self.synonyms.items() if synonym in lower)
+            self._description_masks[description] = mask
+        return mask
+
+    def slot_mask(self, code: int, description: str) -> int:
+        """Returns the mask of a 3 hour slot from its weather condition code and description."""
+        return self.code_masks.get(code, 0) | self.description_mask(description)
+
+    def query(self, conditions: Iterable[str]) -> Tuple[int, Tuple[str, ...]]:
+        """Resolves requested conditions to a mask.
+
+        Args:
+            conditions (list): Requested conditions, values or synonyms of the entity.
+
+        Returns:
+            tuple: The mask of the known conditions, and the lower case conditions the entity
+            doesn't know, which are matched against the weather descriptions instead.
+        """
+        mask = 0
+        unknown = []
+        for condition in conditions:
+            value = self.synonyms.get(condition.lower())
+            if value is None:
+                unknown.append(condition.lower())
+            else:
+                mask |= self.bits[value]
+        return mask, tuple(unknown)
+
+@lru_cache(maxsize=1)
+def condition_index() -> ConditionIndex:
+    """Returns the index of the agent's weather conditions, loaded once per process."""
+    return ConditionIndex.from_entity()
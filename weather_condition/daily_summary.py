@@ -0,0 +1,88 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from typing import Dict, FrozenSet, Optional
+import time
+
+from .condition_index import condition_index
+
+@dataclass(frozen=True)
+class DailySummary:
+    """Pre-aggregated forecast of a single day.
+
+    Built once when a forecast arrives, so the formatters of `DialogHandler` only
+    read these values instead of re-scanning the 3 hour slots on every turn.
+    """
+
+    date: str  # Date in the format YYYY-MM-DD
+    label: str  # Date as shown to the user, e.g. Monday, Feb 24, 2025
+    temp_min: float  # Lowest temperature of the day
+    temp_max: float  # Highest temperature of the day
+    wind_min: float  # Lowest wind speed of the day
+    wind_max: float  # Highest wind speed of the day
+    wind_mode: float  # Most common wind speed of the day
+    weather: str  # Most common weather description of the day (title case)
+    descriptions: Counter = field(compare=False)  # Weather description -> number of slots, in order of appearance
+    conditions: FrozenSet[str] = frozenset()  # Lower case weather descriptions of the day
+    condition_mask: int = 0  # Conditions of any slot of the day, see `ConditionIndex`
+    description_masks: Dict[str, int] = field(default_factory=dict, compare=False)  # Weather description -> its conditions
+
+@dataclass(frozen=True)
+class ForecastSummary:
+    """Daily summaries of an OpenWeatherMap 5 day / 3 hour forecast for one city."""
+
+    location: str  # City name reported by OpenWeatherMap
+    days: Dict[str, DailySummary]  # Date (YYYY-MM-DD) -> daily summary, sorted by date
+    first_slot: Optional[int] = None  # Unix time of the first forecast slot
+
+    @classmethod
+    def from_compact(cls, forecast) -> "ForecastSummary":
+        """Builds the daily summaries from a compact forecast.
+
+        Slots are grouped by their UTC date, like the `dt_txt` field of the OpenWeatherMap API.
+
+        Args:
+            forecast (CompactForecast): The forecast in columnar form.
+
+        Returns:
+            ForecastSummary: The forecast grouped and aggregated per day.
+        """
+        index = condition_index()
+        # Group the slot indexes by date
+        daily_slots = {}
+        dates = {}
+        for slot, dt in enumerate(forecast.dt):
+            day_number = dt // 86400
+            date = dates.get(day_number)
+            if date is None:
+                date = dates[day_number] = time.strftime("%Y-%m-%d", time.gmtime(dt))
+            daily_slots.setdefault(date, []).append(slot)
+
+        days = {}
+        for date in sorted(daily_slots):
+            slots = daily_slots[date]
+            descriptions = Counter(forecast.description(slot) for slot in slots)
+            description_masks = {}
+            for slot in slots:
+                description = forecast.description(slot)
+                description_masks[description] = description_masks.get(description, 0) | index.slot_mask(forecast.weather_id[slot], description)
+            temperatures = [forecast.temp[slot] for slot in slots]
+            wind_speeds = [forecast.wind_speed[slot] for slot in slots]
+            days[date] = DailySummary(
+                date=date,
+                label=datetime.strptime(date, "%Y-%m-%d").strftime("%A, %b %d, %Y"),
+                temp_min=min(temperatures),
+                temp_max=max(temperatures),
+                wind_min=min(wind_speeds),
+                wind_max=max(wind_speeds),
+                wind_mode=Counter(wind_speeds).most_common(1)[0][0],
+                weather=Counter(forecast.description(slot).title() for slot in slots).most_common(1)[0][0],
+                descriptions=descriptions,
+                conditions=frozenset(description.lower() for description in descriptions),
+                condition_mask=reduce(or_, description_masks.values(), 0),
+                description_masks=description_masks,
+            )
+
+        return cls(location=forecast.city_name, days=days, first_slot=forecast.first_slot)
@@ -1,37 +1,72 @@
-from datetime import datetime, timedelta
-from dateutil import parser #type: ignore 
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Dict
 import logging
+import time as clock
 
 from .dialog_handler import DialogHandler
 
+@lru_cache(maxsize=1024)
+def _parse_iso_date(value: str) -> date:
+    """Parses a strict ISO-8601 date or date-time string, memoized per distinct string."""
+    return datetime.fromisoformat(value).date()
+
+def parse_date(value: str) -> date:
+    """Parses a date or date-time string into a `datetime.date`.
+
+    Dialogflow sends `@sys.date-time` values as strict ISO-8601 (e.g. 2025-02-22T12:00:00+01:00),
+    which `datetime.fromisoformat` parses directly. Anything else goes through the fuzzy
+    dateutil parser. Only ISO-8601 results are memoized: they are absolute, while dateutil
+    resolves relative values like "Friday" or "10:00" against the current day.
+
+    Raises:
+        TypeError, ValueError: If the value can't be parsed.
+    """
+    try:
+        return _parse_iso_date(value)
+    except ValueError:
+        from dateutil import parser #type: ignore  # Slow to import and rarely needed
+
+        return parser.parse(value).date()
+
 class DateHandler():
     def __init__(self):
-        self.time = None
         self.dialog_handler = DialogHandler()
+        self._today = (None, 0.0)  # Current local date and the Unix time at which it ends
+
+    def current_date(self) -> date:
+        """Returns the current local date, recomputed only once the day is over."""
+        today, ends_at = self._today
+        if clock.time() >= ends_at:
+            today = datetime.now().astimezone().date()
+            ends_at = datetime.combine(today + timedelta(days=1), datetime.min.time()).astimezone().timestamp()
+            self._today = (today, ends_at)
+        return today
     
     def check_date_range(self, time: Dict):
-        """Validates and extracts start and end dates from `self.time`.
+        """Validates and extracts start and end dates from `time`.
 
         Checks if the parsed start and end dates are within the allowable range 
         (from current date to 5 days ahead). Handles errors if date strings are 
-        missing or parsing fails.
+        missing or parsing fails. No state is stored on the handler, so it can be
+        shared between concurrent requests.
+
+        Args:
+            time (dict | list | str): The `date-time` parameter of the request.
 
         Returns:
             tuple or bool: Returns a tuple of start and end dates if valid, 
                            True if the start date is in the past, 
                            False if the end date exceeds the maximum allowable date.
         """
-        print(f"self.time: {time}")
-        self.time = time 
-        current_date = datetime.now().astimezone().date()  # Get the current date
+        logging.debug("time: %s", time)
+        current_date = self.current_date()  # Get the current date
         max_end_date = current_date + timedelta(days=5)    # Calculate maximum allowed end date
 
-        print("Checking date range...") # Debugging output
-        logging.info("📏Checking date range...")
+        logging.debug("📏Checking date range...")
 
         # Extract date strings from time parameters
-        start_str, end_str = self.__extract_date_strings(current_date)
+        start_str, end_str = self.__extract_date_strings(time, current_date)
         if not start_str or not end_str:
             return self.dialog_handler.handle_error()  # Handle error if date strings are missing
 
@@ -42,50 +77,50 @@ class DateHandler():
 
         # Validate the parsed dates against the allowed range
         outcome = self.__validate_date_range(start_dt, end_dt, current_date, max_end_date)
-        logging.info(f"Date validation outcome: {outcome}")  # Debugging output
+        logging.debug("Date validation outcome: %s", outcome)
         return outcome  # Return the validation outcome
         
-    def __extract_date_strings(self, current_date):
-        """Extracts date strings from `self.time` in different formats.
+    def __extract_date_strings(self, time, current_date):
+        """Extracts date strings from `time` in different formats.
 
-        The `self.time` parameter can be a dictionary with start and end dates,
+        The `time` parameter can be a dictionary with start and end dates,
         a list of two dates, or a single date string. Handles errors if the
         date strings are missing or parsing fails.
         """
         start_str = end_str = None
 
         # Check if the time parameter is a dictionary
-        if isinstance(self.time, dict):
+        if isinstance(time, dict):
             # Get the start and end dates from the dictionary
-            logging.info("Get the start and end dates from the dictionary")
-            start_str = self.time.get("startDate") or self.time.get("startDateTime") or self.time.get("date_time")
-            end_str = self.time.get("endDate") or self.time.get("endDateTime") or self.time.get("date_time")
+            logging.debug("Get the start and end dates from the dictionary")
+            start_str = time.get("startDate") or time.get("startDateTime") or time.get("date_time")
+            end_str = time.get("endDate") or time.get("endDateTime") or time.get("date_time")
 
         # Check if the time parameter is a list
-        elif isinstance(self.time, list):
+        elif isinstance(time, list):
             # Check if the list contains a dictionary
-            if len(self.time) == 1 and isinstance(self.time[0], dict):
-                time_dict = self.time[0]
+            if len(time) == 1 and isinstance(time[0], dict):
+                time_dict = time[0]
                 start_str = time_dict.get("startDate") or time_dict.get("startDateTime") or time_dict.get("date_time")
                 end_str = time_dict.get("endDate") or time_dict.get("endDateTime") or time_dict.get("date_time")
             # Check if the list contains a string
-            elif len(self.time) == 1 and isinstance(self.time[0], str):
-                start_str = end_str = self.time[0]
+            elif len(time) == 1 and isinstance(time[0], str):
+                start_str = end_str = time[0]
             # If the list contains more than one element, use the first two
-            elif len(self.time) > 1:
-                start_str = self.time[0]
-                end_str = self.time[1]
+            elif len(time) > 1:
+                start_str = time[0]
+                end_str = time[1]
             # If the list is empty, use the current date
             else:
                 start_str = end_str = current_date.strftime("%Y-%m-%d")
         # Check if the time parameter is a string        
-        elif isinstance(self.time, str):
-            start_str = end_str = self.time
+        elif isinstance(time, str):
+            start_str = end_str = time
         # If the time parameter is not a dictionary or list, use the current date
         else:
             start_str = end_str = current_date.strftime("%Y-%m-%d")
 
-        logging.info(f"start_str: {start_str} | end_str: {end_str}")
+        logging.debug("start_str: %s | end_str: %s", start_str, end_str)
 
         # Check if the end date is a dictionary
         if isinstance(end_str, dict):
@@ -111,14 +146,11 @@ class DateHandler():
                    or `(None, None)` if parsing fails.
         """
         try:
-            # Parse the date strings into datetime objects
-            start_dt = parser.parse(start_str)
-            end_dt = parser.parse(end_str)
-            # Return the parsed date objects
-            return start_dt.date(), end_dt.date()
+            # Parse the date strings into date objects
+            return parse_date(start_str), parse_date(end_str)
         except (TypeError, ValueError) as e:
             # Log an error if parsing fails
-            logging.error(f"⛔ Error parsing date! {e}")
+            logging.error("⛔ Error parsing date! %s", e)
             # Return None on failure
             return None, None
 
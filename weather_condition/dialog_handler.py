@@ -1,17 +1,22 @@
-from collections import defaultdict, Counter
-from datetime import datetime
-from typing import Final
-import json
+from typing import Final, Optional
 import random
 import logging
 
 from weather_condition.precipitation import condition_emojis
+from weather_condition.daily_summary import ForecastSummary
+from weather_condition.condition_index import condition_index
+from weather_condition.compact_forecast import CompactForecast
+from weather_condition.metrics import metrics
+from weather_condition.fulfillment import FulfillmentResponse, build_response
+from weather_condition.response_cache import ResponseCache
 
 FMT: Final = "%Y-%m-%d"
+# Shown below a forecast that expired because OpenWeatherMap didn't answer in time
+STALE_NOTE: Final = "⏳ This forecast is slightly out of date, an update is on its way."
 
 class DialogHandler:
-    def __init__(self):
-        pass
+    def __init__(self, response_cache: Optional[ResponseCache] = None):
+        self.response_cache = response_cache # Rendered forecast responses, if set
     @staticmethod
     def _generate_response(responses: list) -> dict:
         resp = random.choice(responses)
@@ -68,13 +73,13 @@ class DialogHandler:
         """
         if time[0] == time[1]:
             # If the time range is a single day, only select that day
-            print(f"time[0] == time[1]: {time[0]}")
+            logging.debug("time[0] == time[1]: %s", time[0])
             for date in selected_dates:
                 if date == time[0].strftime(FMT):
                     selected_dates = [date]
         else:
             # If the time range is a range of days, select all days within that range
-            print(f"time[0] != time[1]: {time[0]}")
+            logging.debug("time[0] != time[1]: %s", time[0])
             start_dt = time[0].strftime(FMT)
             end_dt = time[1].strftime(FMT)
             selected_dates = [date for date in selected_dates if start_dt <= date <= end_dt]
@@ -92,13 +97,11 @@ class DialogHandler:
         Returns:
             str or None: The emoji representing the attribute or None if not found.
         """
-        logging.info(f"🔎 Finding {attribute_name}..")
+        logging.debug("🔎 Finding %s..", attribute_name)
         
         # Check if the attribute list is not empty
         if attribute_list:
-            print(f"{attribute_name.capitalize()}: {attribute_list}")
-            print(f"Type: {type(attribute_list[0])}")
-            print(f"Attribute List: {attribute_list}")
+            logging.debug("%s: %s", attribute_name.capitalize(), attribute_list)
             
             # Get the emoji for the first attribute in the list, if it exists
             return condition_emojis.get(attribute_list[0].lower(), None)
@@ -124,7 +127,7 @@ class DialogHandler:
 
         Args:
             selected_dates (list): A list of selected dates for which to format the forecast.
-            daily_forecasts (dict): A dictionary of daily forecasts with the date as the key.
+            daily_forecasts (dict): A dictionary of daily summaries with the date as the key.
 
         Returns:
             list: A list of formatted forecast entries.
@@ -133,37 +136,19 @@ class DialogHandler:
         
         # Iterate over the selected dates
         for date in selected_dates:
-            daily_entries = daily_forecasts.get(date, [])
-            if not daily_entries:
+            day = daily_forecasts.get(date)
+            if day is None:
                 continue  # Skip if no forecast data available
-            
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%A, %b %d, %Y")
-
-            # Determine the most common weather description
-            weather_descriptions = [entry['weather'][0]['description'].title() for entry in daily_entries]
-            most_common_weather = Counter(weather_descriptions).most_common(1)
-            most_common_weather = most_common_weather[0][0] if most_common_weather else "Unknown"
-
-            # Determine the temperature range
-            temperatures = [entry['main']['temp'] for entry in daily_entries]
-            min_temp, max_temp = (min(temperatures), max(temperatures)) if temperatures else (0, 0)
-            temp_info = f"🔽 {min_temp:.1f}°C → 🔼 {max_temp:.1f}°C"
-
-            # Determine the most common wind speed
-            wind_speeds = [entry['wind']['speed'] for entry in daily_entries]
-            most_common_wind_speed = Counter(wind_speeds).most_common(1)
-            most_common_wind_speed = most_common_wind_speed[0][0] if most_common_wind_speed else 0
 
-            # Assemble the forecast
+            # Assemble the forecast from the most common weather, the temperature range and the most common wind speed
             forecast.append({
-                "date": formatted_date,
-                "weather": most_common_weather,
-                "temperature": temp_info,
-                "wind_speed": f"{most_common_wind_speed} m/s"
+                "date": day.label,
+                "weather": day.weather,
+                "temperature": f"🔽 {day.temp_min:.1f}°C → 🔼 {day.temp_max:.1f}°C",
+                "wind_speed": f"{day.wind_mode} m/s"
             })
         
-        logging.info("📅⚙️ Formatting forecast body complete")  # Log after processing
+        logging.debug("📅⚙️ Formatting forecast body complete")  # Log after processing
         return forecast
     
     def __forecast_body_condition(self, selected_dates, daily_forecasts, condition) -> str:
@@ -172,38 +157,42 @@ class DialogHandler:
 
         Args:
             selected_dates (list): A list of selected dates for which to format the forecast.
-            daily_forecasts (dict): A dictionary of daily forecasts with the date as the key.
+            daily_forecasts (dict): A dictionary of daily summaries with the date as the key.
             condition (list): A list of weather conditions to find in the forecast.
 
         Returns:
             str: The formatted forecast body with the weather condition.
         """
-        logging.info(f"📅⚙️ Formatting forecast body {condition}")
+        logging.debug("📅⚙️ Formatting forecast body %s", condition)
         forecast = []
         
-        common_weather = []
-        print(f"Type: {type(condition)}")
+        # Resolve the requested conditions once, conditions the agent doesn't know are matched by description
+        mask, unknown = condition_index().query(condition)
+        emoji = self.__emoij_condition(condition)
+
         for date in selected_dates: 
-            daily_entries = daily_forecasts[date] 
-            for entry in daily_entries:
-                print(entry['weather'][0]['description'].lower())
-                for i in condition:
-                    if i in entry['weather'][0]['description'].lower():
-                        common_weather.append(entry['weather'][0]['description'].title())
-                    else:
-                        common_weather.append(f"No {i}")
-            
-            print(f"Common Weather: {common_weather}")
-            common_we = Counter(common_weather).most_common(1)[0][0]
+            day = daily_forecasts.get(date)
+            if day is None:
+                continue  # Skip if no forecast data available
+
+            # One mask test tells whether any 3 hour slot of the day has a requested condition
+            matched = day.condition_mask & mask or (unknown and any(term in description for description in day.conditions for term in unknown))
+            if matched:
+                # Report the most common weather description with a requested condition
+                common_we, most_slots = None, 0
+                for description, slots in day.descriptions.items():
+                    if slots > most_slots and (day.description_masks[description] & mask or any(term in description.lower() for term in unknown)):
+                        common_we, most_slots = description, slots
+                common_we = common_we.title()
+            else:
+                common_we = f"No {' or '.join(condition)}"
+            logging.debug("Common Weather: %s", common_we)
              
-            emoji = self.__emoij_condition(condition)
             common_w = f"{emoji} {common_we}"   
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%A, %b %d, %Y")
              
              # Assemble the forecast
             forecast.append({
-                "date": formatted_date,
+                "date": day.label,
                 "weather": common_w
             })      
                                 
@@ -211,87 +200,67 @@ class DialogHandler:
     
     def __forecast_body_temperature(self, selected_dates, daily_forecasts, temperature) -> str:
         """
-        Formats the forecast body by extracting the minimum and maximum temperatures from the daily forecasts.
+        Formats the forecast body with the minimum and maximum temperatures of the daily forecasts.
         
         Args:
             selected_dates (list): A list of selected dates for which to format the forecast.
-            daily_forecasts (dict): A dictionary of daily forecasts with the date as the key.
+            daily_forecasts (dict): A dictionary of daily summaries with the date as the key.
             temperature (list): A list of temperature options to find in the forecast.
             
         Returns:
             str: The formatted forecast body with the temperature information.
         """
-        print(f"📅⚙️ Formatting forecast body {temperature}")
+        logging.debug("📅⚙️ Formatting forecast body %s", temperature)
         forecast = []
         
         # Iterate over the selected dates
         for date in selected_dates:
-            print("For loop ONE")
-            daily_entries = daily_forecasts[date] 
-             
-            # Extract the temperatures from the daily entries
-            temperatures = [entry['main']['temp'] for entry in daily_entries]
-            min_temp, max_temp = min(temperatures), max(temperatures)
-            temp_info = f"🔽 {min_temp:.1f}°C \n 🔼{max_temp:.1f}°C"
-                 
-            # Format the date
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%A, %b %d, %Y")
+            day = daily_forecasts[date] 
                 
             # Assemble the forecast
             forecast.append({
-                "date": formatted_date,
-                "temperature": temp_info
+                "date": day.label,
+                "temperature": f"🔽 {day.temp_min:.1f}°C \n 🔼{day.temp_max:.1f}°C"
             })
         
-        logging.info("📅⚙️ Formatting forecast body complete")             
+        logging.debug("📅⚙️ Formatting forecast body complete")
         return forecast
     
     def __forecast_body_wind_speed(self, selected_dates, daily_forecasts, wind_speed) -> str:
         """
-        Formats the forecast body by extracting the minimum and maximum wind speeds from the daily forecasts.
+        Formats the forecast body with the minimum and maximum wind speeds of the daily forecasts.
         
         Args:
             selected_dates (list): A list of selected dates for which to format the forecast.
-            daily_forecasts (dict): A dictionary of daily forecasts with the date as the key.
+            daily_forecasts (dict): A dictionary of daily summaries with the date as the key.
             wind_speed (list): A list of wind speed options to find in the forecast.
             
         Returns:
             str: The formatted forecast body with the wind speed information.
         """
-        print(f"📅⚙️ Formatting forecast body {wind_speed}")
+        logging.debug("📅⚙️ Formatting forecast body %s", wind_speed)
         forecast = []
         
         # Iterate over the selected dates
         for date in selected_dates:
-            print("For loop ONE")
-            daily_entries = daily_forecasts[date] 
-             
-            # Extract the wind speeds from the daily entries
-            wind_speeds = [entry['wind']['speed'] for entry in daily_entries]
-            min_wind, max_wind = min(wind_speeds), max(wind_speeds)
-            common_wind_speed  = f"🔽 {min_wind:.1f} m/s → 🔼 {max_wind:.1f} m/s"
-                
-            # Format the date
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%A, %b %d, %Y")
+            day = daily_forecasts[date] 
+            common_wind_speed  = f"🔽 {day.wind_min:.1f} m/s → 🔼 {day.wind_max:.1f} m/s"
                 
             # Assemble the forecast
             forecast.append({
-                "date": formatted_date,
+                "date": day.label,
                 "wind_speed": f"{common_wind_speed} m/s"
             })
                                    
         return forecast
     
-    def __forecast_formatter(self, selected_dates: list, forecast_data: dict, daily_forecasts: dict, condition=None, temperature=None, wind_speed=None) -> dict:
+    def __forecast_formatter(self, selected_dates: list, forecast_data: ForecastSummary, condition=None, temperature=None, wind_speed=None) -> dict:
         """
         Formats the forecast output according to the specified condition, temperature, or wind speed.
         
         Args:
             selected_dates (list): A list of selected dates for which to format the forecast.
-            forecast_data (dict): A dictionary of forecast data returned from the OpenWeatherMap API.
-            daily_forecasts (dict): A dictionary of daily forecasts with the date as the key.
+            forecast_data (ForecastSummary): The forecast aggregated per day.
             condition (str, optional): The condition to filter the forecast by. Defaults to None.
             temperature (str, optional): The temperature to filter the forecast by. Defaults to None.
             wind_speed (str, optional): The wind speed to filter the forecast by. Defaults to None.
@@ -299,112 +268,82 @@ class DialogHandler:
         Returns:
             dict: The forecast output as a dictionary.
         """
-        print("📅⚙️ Formatting forecast output...")
+        logging.debug("📅⚙️ Formatting forecast output...")
         forecast_report = {
-             "location": forecast_data["city"]["name"]
+             "location": forecast_data.location
         }
+        daily_forecasts = forecast_data.days
         
         if condition:
             # Filter the forecast by condition
-            #forecast_report += self.__forecast_body_condition(selected_dates, daily_forecasts, condition)
             forecast_report["conditions"]=(self.__forecast_body_condition(selected_dates, daily_forecasts, condition))
-            #return forecast_report 
         elif temperature:
             # Filter the forecast by temperature
-            #forecast_report += self.__forecast_body_temperature(selected_dates, daily_forecasts, temperature)
             forecast_report["conditions"]=(self.__forecast_body_temperature(selected_dates, daily_forecasts, temperature))
-            #return  forecast_report
         elif wind_speed:
             # Filter the forecast by wind speed
-            #forecast_report += self.__forecast_body_wind_speed(selected_dates, daily_forecasts, wind_speed)
             forecast_report["conditions"]=(self.__forecast_body_wind_speed(selected_dates, daily_forecasts, wind_speed))
-            #return forecast_report
         else:
             # Return the full forecast
-            #forecast_report += self.__forecast_body(selected_dates, daily_forecasts)
             forecast_report["conditions"]=(self.__forecast_body(selected_dates, daily_forecasts))
         
         return forecast_report
 
-    def format_weather_response(self, forecast: dict) -> json:
-        logging.info("📅⚙️ Formatting weather response...")
-
-        location = forecast.get("location", "Unknown Location")  
-        conditions = forecast.get("conditions", "Unknown Conditions")  
-        # Create forecast messages for multiple days
-        forecast_texts = []
-        
-        for day in conditions:
-            print(day)
-            details = []
-
-            # Add only if not "Unknown"
-            if day.get('date') and day.get('date') != "Unknown Date":
-                details.append(f"📅 {day['date']}")
-            if day.get('weather') and day.get('weather') != "Unknown":
-                details.append(f"⛅ Weather: {day['weather']}")
-            if day.get('temperature') and day.get('temperature') != "Unknown":
-                details.append(f"🌡️ Temperature: {day['temperature']}")
-            if day.get('wind_speed') and day.get('wind_speed') != "Unknown":
-                details.append(f"💨 Wind Speed: {day['wind_speed']}")
+    def format_weather_response(self, forecast: dict) -> FulfillmentResponse:
+        """
+        Builds the Dialogflow fulfillment response of a formatted forecast.
 
-            if details:  # Only add if there’s at least one valid detail
-                forecast_texts.append("\n".join(details))
+        Args:
+            forecast (dict): The location, the forecast of every selected day and whether it is stale.
 
-            # Build response
-            response = {
-                "fulfillmentMessages": [
-                    {
-                        "platform": "PLATFORM_UNSPECIFIED",
-                        "payload": {
-                            "richContent": [
-                                [
-                                    {
-                                        "type": "description",
-                                        "title": "Weather Forecast",
-                                        "text": [
-                                            f"📍 {location}",
-                                            *forecast_texts,  
-                                        ]
-                                    }
-                                ]
-                            ]
-                        }
-                    }
-                ]
-            }
+        Returns:
+            FulfillmentResponse: The response, a dict that can also serialize itself to JSON bytes.
+        """
+        logging.debug("📅⚙️ Formatting weather response...")
 
-        return response
+        location = forecast.get("location", "Unknown Location")  
+        conditions = forecast.get("conditions", "Unknown Conditions")  
+        return build_response(location, conditions, STALE_NOTE if forecast.get("stale") else None)
     
-    def format_forecast_output(self, weather, time, forecast_data: dict) -> str:
+    def format_forecast_output(self, context, time, forecast_data: CompactForecast, stale: bool = False) -> str:
         """
         Formats the forecast output based on the specified condition, temperature, or wind speed.
+
+        With a response cache, a turn that was answered before from the same forecast
+        is served the stored response without formatting it again.
         
         Args:
-            weather (Weather): The Weather object containing the condition, temperature, and wind speed options.
+            context (RequestContext): The request context containing the condition, temperature, and wind speed options.
             time (str): The time range for which to format the forecast.
-            forecast_data (dict): A dictionary of forecast data returned from the OpenWeatherMap API.
+            forecast_data (CompactForecast): The forecast returned from the OpenWeatherMap API in compact form.
+            stale (bool): Whether the forecast expired and the response should say so.
             
         Returns:
             str: The formatted forecast output.
         """
+        key = None
+        if self.response_cache is not None:
+            key = self.response_cache.make_key(forecast_data, time, context, stale)
+            if key is not None:
+                cached = self.response_cache.get(key, forecast_data)
+                if cached is not None:
+                    return cached
         
-        # Group forecast entries by date
-        logging.info("📅⚙️ Grouping forecast entries by date...")
-        daily_forecasts = defaultdict(list)
-        for forecast in forecast_data['list']:
-            date_str = forecast['dt_txt'].split()[0]
-            daily_forecasts[date_str].append(forecast)
-
-        sorted_dates = sorted(daily_forecasts.keys())
-        selected_dates = sorted_dates[:6]
+        # The daily summaries are sorted by date
+        summary = forecast_data.summary
+        selected_dates = list(summary.days)[:6]
         
         # Select the dates based on the time range
         selected_dates = self.__select_dates(time, selected_dates)
-        print(selected_dates)
+        logging.debug("Selected dates: %s", selected_dates)
             
         # Format the forecast
-        forecast = self.__forecast_formatter(selected_dates, forecast_data, daily_forecasts, weather.condition, weather.temperature, weather.wind_speed)
-        formatted = self.format_weather_response(forecast)
+        with metrics.stage("forecast_body"):
+            forecast = self.__forecast_formatter(selected_dates, summary, context.condition, context.temperature, context.wind_speed)
+            forecast["stale"] = stale
+        with metrics.stage("format_response"):
+            formatted = self.format_weather_response(forecast)
+        if key is not None:
+            self.response_cache.put(key, forecast_data, formatted)
 
         return formatted
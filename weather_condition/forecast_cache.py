@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import logging
+import threading
+import time
+
+# OpenWeatherMap refreshes the 5 day / 3 hour forecast every 3 hours
+OWM_REFRESH_INTERVAL = 3 * 60 * 60
+
+class ForecastCache:
+    """Bounded in-process LRU cache for OpenWeatherMap forecasts.
+
+    Entries are keyed by the normalized city, units and language of the request and
+    expire at the next 3 hour OWM refresh boundary of the cached forecast. Expired
+    entries are kept for up to `max_stale` seconds, so `get_stale` can still serve them
+    while OpenWeatherMap is slow or down.
+    """
+
+    def __init__(self, max_entries: int = 256, refresh_interval: int = OWM_REFRESH_INTERVAL,
+                 max_stale: float = 12 * 60 * 60):
+        """Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cities kept before the least recently used one is evicted.
+            refresh_interval (int): Refresh cycle of the upstream data in seconds.
+            max_stale (float): Seconds an expired entry is kept for `get_stale`.
+        """
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self.max_stale = max_stale
+        self._entries = OrderedDict()  # key -> (expires_at, forecast)
+        self._lock = threading.Lock()
+        self.hits = 0  # Number of lookups answered from the cache
+        self.misses = 0  # Number of lookups that had to go upstream
+        self.evictions = 0  # Number of entries dropped to stay within max_entries
+
+    @staticmethod
+    def make_key(city: str, units: str, lang: str) -> Tuple[str, str, str]:
+        """Builds the cache key for a request.
+
+        Args:
+            city (str): City name as sent by Dialogflow.
+            units (str): Units requested from OpenWeatherMap (e.g. metric).
+            lang (str): Language requested from OpenWeatherMap (e.g. en).
+
+        Returns:
+            tuple: The normalized (city, units, lang) key.
+        """
+        return " ".join(city.split()).casefold(), units, lang
+
+    def expires_at(self, first_slot: Optional[int], now: Optional[float] = None) -> float:
+        """Calculates when a forecast becomes stale.
+
+        The first slot of a forecast (`list[0].dt`) is aligned to the 3 hour grid OWM refreshes on.
+        Once that slot has passed, OWM serves a newer forecast, so the entry expires at that boundary.
+
+        Args:
+            first_slot (int, optional): Unix time of the first forecast slot.
+            now (float, optional): Current unix time. Defaults to `time.time()`.
+
+        Returns:
+            float: Unix time at which the entry expires.
+        """
+        now = time.time() if now is None else now
+        next_boundary = now - now % self.refresh_interval + self.refresh_interval
+        if first_slot is None:
+            return next_boundary
+        boundary = first_slot - first_slot % self.refresh_interval
+        if boundary <= now:
+            return next_boundary
+        # Never keep an entry for longer than one refresh cycle
+        return min(boundary, now + self.refresh_interval)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached forecast for `key` or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, forecast = entry
+            now = time.time()
+            if expires_at <= now:
+                if expires_at + self.max_stale <= now:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return forecast
+
+    def is_current(self, key: Hashable, when: Optional[float] = None) -> bool:
+        """Returns whether the forecast for `key` is still current at `when`, without counting a lookup.
+
+        Args:
+            key (hashable): Key built with `make_key`.
+            when (float, optional): Unix time to check. Defaults to `time.time()`.
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > when
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Returns an expired forecast for `key` and the seconds since it expired.
+
+        Returns:
+            tuple or None: The forecast and its age, or None if there is no expired entry
+            or it expired more than `max_stale` seconds ago.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, forecast = entry
+            age = time.time() - expires_at
+            if age < 0 or age >= self.max_stale:
+                return None
+            return forecast, age
+
+    def put(self, key: Hashable, forecast: Any, first_slot: Optional[int] = None) -> None:
+        """Stores a forecast and evicts the least recently used entries if the cache is full.
+
+        Args:
+            key (hashable): Key built with `make_key`.
+            forecast: The forecast to cache, e.g. a `ForecastSummary`.
+            first_slot (int, optional): Unix time of the first forecast slot, used for the expiry.
+        """
+        expires_at = self.expires_at(first_slot)
+        with self._lock:
+            self._entries[key] = (expires_at, forecast)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logging.info("🗑️ Evicted forecast for %s from cache", evicted[0])
+
+    def clear(self) -> None:
+        """Removes all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Returns the cache counters for monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
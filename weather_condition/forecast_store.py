@@ -0,0 +1,154 @@
+from typing import Dict, Hashable, Optional
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from .compact_forecast import CompactForecast
+
+class ForecastStore:
+    """Persistent SQLite store for forecasts that survives restarts of the webhook.
+
+    Forecasts are read lazily, one key at a time, when the in-memory cache misses.
+    Writes are queued and performed by a background thread (write-behind), so a
+    request never waits on the disk to store a forecast. The queue is written out
+    when the process exits, e.g. when the worker is recycled.
+    """
+
+    def __init__(self, path: str, max_queue: int = 1000):
+        """Initialize the store.
+
+        Args:
+            path (str): Path of the SQLite database file, created if missing.
+            max_queue (int): Maximum number of pending writes; further writes are dropped.
+        """
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._reader = None  # Connection for lookups, opened on first use
+        self._reader_lock = threading.Lock()
+        self._writer = None
+        self.hits = 0  # Number of lookups answered from disk
+        self.misses = 0  # Number of lookups not found or expired on disk
+        self.writes = 0  # Number of forecasts written
+        self.dropped = 0  # Number of writes dropped because the queue was full
+        self.errors = 0  # Number of failed reads or writes
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens a connection and creates the table if needed."""
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS forecasts (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, forecast BLOB NOT NULL)"
+        )
+        connection.commit()
+        return connection
+
+    @staticmethod
+    def __key(key: Hashable) -> str:
+        """Converts a cache key to the text stored in the database."""
+        return "|".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+    def get(self, key: Hashable) -> Optional[CompactForecast]:
+        """Returns the stored forecast for `key` or None if missing or expired."""
+        try:
+            with self._reader_lock:
+                if self._reader is None:
+                    self._reader = self.__connect()
+                row = self._reader.execute(
+                    "SELECT forecast FROM forecasts WHERE key = ? AND expires_at > ?", (self.__key(key), time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logging.error("⛔ Error reading forecast store: %s", e)
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CompactForecast.from_bytes(row[0])
+
+    def put(self, key: Hashable, forecast: CompactForecast, expires_at: float) -> None:
+        """Queues a forecast to be written by the background thread.
+
+        Args:
+            key (hashable): Cache key of the forecast.
+            forecast (CompactForecast): The forecast to persist.
+            expires_at (float): Unix time at which the forecast expires.
+        """
+        self.__start()
+        try:
+            self._queue.put_nowait((self.__key(key), expires_at, forecast.to_bytes()))
+        except queue.Full:
+            self.dropped += 1
+
+    def __start(self) -> None:
+        """Starts the writer thread on first use."""
+        if self._writer is None:
+            with self._reader_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self.__write_behind, name="forecast-store", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)  # Writes the remaining forecasts on shutdown
+
+    def __write_behind(self) -> None:
+        """Writes queued forecasts in batches and purges expired ones until `close` is called."""
+        connection = self.__connect()
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            # Write everything that queued up meanwhile in one transaction
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            closing = len(rows) < len(batch)  # None is queued by `close`
+            try:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO forecasts (key, expires_at, forecast) VALUES (?, ?, ?)", rows)
+                    connection.execute("DELETE FROM forecasts WHERE expires_at <= ?", (time.time(),))
+                self.writes += len(rows)
+            except sqlite3.Error as e:
+                self.errors += 1
+                logging.error("⛔ Error writing forecast store: %s", e)
+            for _ in batch:
+                self._queue.task_done()
+        connection.close()
+
+    def flush(self) -> None:
+        """Blocks until all queued writes are on disk."""
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Writes the queued forecasts and stops the writer thread.
+
+        Args:
+            timeout (float): Seconds to wait for the pending writes.
+        """
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logging.warning("⚠️ Forecast store queue still full, %d forecasts not written", self._queue.qsize())
+            else:
+                writer.join(timeout)
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def stats(self) -> Dict:
+        """Returns the store counters for monitoring."""
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional
+import json
+
+def _envelope(text) -> Dict:
+    """Returns the Dialogflow rich content envelope around the lines of a forecast."""
+    return {
+        "fulfillmentMessages": [
+            {
+                "platform": "PLATFORM_UNSPECIFIED",
+                "payload": {
+                    "richContent": [
+                        [
+                            {
+                                "type": "description",
+                                "title": "Weather Forecast",
+                                "text": text,
+                            }
+                        ]
+                    ]
+                }
+            }
+        ]
+    }
+
+# The serialized envelope around the lines, so responses only encode their text. The
+# escaped ASCII output of the encoder is faster than UTF-8 for the emoji of the lines.
+_JSON_PREFIX, _JSON_SUFFIX = json.dumps(_envelope(None), separators=(",", ":")).split("null")
+_encode_text = json.JSONEncoder(separators=(",", ":")).encode
+
+class FulfillmentResponse(dict):
+    """Dialogflow fulfillment response of a forecast.
+
+    It is a plain dict for callers that inspect or re-serialize it, and `to_json`
+    encodes it to bytes without walking the envelope again.
+    """
+
+    __slots__ = ("text", "_json")
+
+    def __init__(self, text: List[str]):
+        super().__init__(_envelope(text))
+        self.text = text  # Lines of the description card, shared with the dict
+        self._json = None  # Serialized response, encoded on first use
+
+    def to_json(self) -> bytes:
+        """Returns the response serialized as UTF-8 JSON, encoded once per response."""
+        if self._json is None:
+            self._json = (_JSON_PREFIX + _encode_text(self.text) + _JSON_SUFFIX).encode()
+        return self._json
+
+def render_day(day: Dict) -> str:
+    """Renders the lines of one day, leaving out missing and unknown values."""
+    # Unrolled on purpose, a loop over line templates is slower than the f-strings
+    details = []
+    if (value := day.get("date")) and value != "Unknown Date":
+        details.append(f"📅 {value}")
+    if (value := day.get("weather")) and value != "Unknown":
+        details.append(f"⛅ Weather: {value}")
+    if (value := day.get("temperature")) and value != "Unknown":
+        details.append(f"🌡️ Temperature: {value}")
+    if (value := day.get("wind_speed")) and value != "Unknown":
+        details.append(f"💨 Wind Speed: {value}")
+    return "\n".join(details)
+
+def build_response(location: str, conditions: List[Dict], note: Optional[str] = None) -> FulfillmentResponse:
+    """Builds the fulfillment response of a forecast once per turn.
+
+    Args:
+        location (str): Name of the city.
+        conditions (list): Forecast of every selected day, as built by the `DialogHandler` formatters.
+        note (str, optional): Line added after the days, e.g. that the forecast is out of date.
+
+    Returns:
+        FulfillmentResponse: The response with a line for the location and one text per day.
+
+    Raises:
+        ValueError: If no day was selected.
+    """
+    if not conditions:
+        raise ValueError("No forecast for the selected dates")
+    text = [f"📍 {location}"]
+    for day in conditions:
+        lines = render_day(day)
+        if lines:  # Only add if there’s at least one valid detail
+            text.append(lines)
+    if note:
+        text.append(note)
+    return FulfillmentResponse(text)
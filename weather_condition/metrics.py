@@ -0,0 +1,174 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+import threading
+import time
+
+# Upper bounds in seconds of the latency buckets, from sub-millisecond formatting to upstream timeouts
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Counters with their label name and help text
+COUNTERS = {
+    "owm_responses_total": ("status", "Responses of the OpenWeatherMap API by HTTP status, or error if none was received."),
+    "forecast_lookups_total": ("outcome", "Forecast lookups by the layer that answered them, or miss if fetched upstream."),
+    "stale_forecasts_total": ("reason", "Expired forecasts served because OpenWeatherMap didn't answer before the deadline, failed or the quota was used up."),
+    "response_cache_total": ("result", "Rendered response lookups by result: hit, miss or invalidated by a newer forecast."),
+    "owm_quota_denied_total": ("priority", "Upstream calls refused by the quota manager by priority class."),
+}
+
+# Gauges with their label name and help text, read from a registered callback when rendered
+GAUGES = {
+    "owm_quota_remaining": ("window", "Upstream calls left in each quota window of the OpenWeatherMap plan."),
+}
+
+# Histograms other than the stage latencies, with their buckets in seconds and help text
+HISTOGRAMS = {
+    "forecast_stale_age_seconds": ((60, 300, 900, 1800, 3600, 7200, 10800, 21600, 43200), "Time since served stale forecasts expired."),
+}
+
+class Histogram:
+    """Latency histogram with fixed buckets, in the layout Prometheus expects."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Observations per bucket, the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Records one observation in seconds."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Returns the cumulative bucket counts and the sum of all observations."""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+class _NullTimer:
+    """Timer returned while metrics are disabled, entering and leaving it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _StageTimer:
+    """Measures one run of a stage and records it in the stage's histogram."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """Per-stage latency histograms and event counters of the webhook pipeline.
+
+    Metrics are disabled by default. While disabled, `stage` returns a shared no-op
+    timer and `increment` returns right away, so the instrumentation costs one
+    attribute check per call site.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {name: Counter() for name in COUNTERS}
+        self._histograms: Dict[str, Histogram] = {name: Histogram(buckets) for name, (buckets, _) in HISTOGRAMS.items()}
+        self._gauges: Dict[str, Callable[[], Dict]] = {}  # Gauge name -> callback returning label value -> value
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """Returns a context manager timing one run of the stage `name`.
+
+        Example:
+            with metrics.stage("upstream_fetch"):
+                response = client.get(url, params)
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram())
+        return _StageTimer(histogram)
+
+    def increment(self, name: str, label) -> None:
+        """Counts one event of the counter `name` with the given label value."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name][str(label)] += 1
+
+    def observe(self, name: str, value: float) -> None:
+        """Records one observation of the histogram `name`."""
+        if not self.enabled:
+            return
+        self._histograms[name].observe(value)
+
+    def register_gauge(self, name: str, callback: Callable[[], Dict]) -> None:
+        """Sets the callback returning the current values of the gauge `name` by label value."""
+        self._gauges[name] = callback
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP webhook_stage_seconds Time spent in each stage of a webhook turn.",
+            "# TYPE webhook_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = {name: sorted(counter.items()) for name, counter in self._counters.items()}
+        for stage, histogram in stages:
+            cumulative, total = histogram.snapshot()
+            for bound, count in zip(histogram.buckets, cumulative):
+                lines.append(f'webhook_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'webhook_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'webhook_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'webhook_stage_seconds_count{{stage="{stage}"}} {cumulative[-1]}')
+        for name, (label, description) in COUNTERS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for value, count in counters[name]:
+                lines.append(f'{name}{{{label}="{value}"}} {count}')
+        for name, (_, description) in HISTOGRAMS.items():
+            cumulative, total = self._histograms[name].snapshot()
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for bound, count in zip(self._histograms[name].buckets, cumulative):
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative[-1]}')
+            lines.append(f"{name}_sum {total}")
+            lines.append(f"{name}_count {cumulative[-1]}")
+        for name, (label, description) in GAUGES.items():
+            callback = self._gauges.get(name)
+            if callback is None:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for value, amount in sorted(callback().items()):
+                lines.append(f'{name}{{{label}="{value}"}} {amount}')
+        return "\n".join(lines) + "\n"
+
+# Shared by all components of the process, enabled by `Weather` if METRICS_ENABLED=1
+metrics = Metrics()
@@ -0,0 +1,263 @@
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+import json
+import logging
+import random
+import threading
+import time
+
+from .metrics import metrics
+
+try:
+    import orjson #type: ignore
+except ImportError:  # orjson is optional, without it the standard library decoder is used
+    orjson = None
+
+if TYPE_CHECKING:
+    import requests #type: ignore
+
+# Status codes worth retrying, the request is a plain GET and therefore idempotent
+RETRY_STATUS_CODES = frozenset({500, 502, 503, 504})
+# The API key is over the limits of its plan, retrying would only spend more of it
+THROTTLED_STATUS_CODE = 429
+
+def decode_body(body: bytes):
+    """Parses a JSON response body of OpenWeatherMap once.
+
+    Uses orjson if it is installed, which parses a forecast in less than half the time of
+    the standard library. The caller extracts the fields it needs right away and drops the
+    parsed payload.
+
+    Args:
+        body (bytes): The raw UTF-8 response body.
+
+    Returns:
+        The parsed JSON document.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+class UpstreamError(Exception):
+    """Raised when OpenWeatherMap could not be reached or kept failing."""
+
+class CircuitOpenError(UpstreamError):
+    """Raised without contacting OpenWeatherMap while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Circuit breaker that stops calling the upstream while it keeps failing.
+
+    The breaker opens after `failure_threshold` consecutive failures. After `reset_timeout`
+    seconds a single trial call is let through (half-open); its outcome closes or reopens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Initialize the circuit breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures after which the breaker opens.
+            reset_timeout (float): Seconds the breaker stays open before a trial call is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0  # Consecutive failures
+        self.opened_at = 0.0  # Time the breaker last opened
+        self.times_opened = 0  # Number of times the breaker opened
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Returns True if a call to the upstream may be made."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Records a successful call and closes the breaker."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info("✅ OpenWeatherMap recovered, closing circuit breaker")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Records a failed call and opens the breaker if the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logging.warning("⛔ OpenWeatherMap failing, opening circuit breaker for %ss", self.reset_timeout)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        """Returns the breaker state for monitoring."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+            }
+
+class OWMClient:
+    """Pooled HTTP client for the OpenWeatherMap API.
+
+    Keeps connections alive between turns, bounds every call with connect/read timeouts,
+    retries idempotent failures with jittered exponential backoff and fails fast through
+    a circuit breaker while OpenWeatherMap is down.
+    """
+
+    def __init__(self, connect_timeout: float = 2.0, read_timeout: float = 3.0, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_max: float = 1.0, pool_size: int = 10,
+                 breaker: Optional[CircuitBreaker] = None):
+        """Initialize the client.
+
+        Args:
+            connect_timeout (float): Seconds to wait for the TCP/TLS connection.
+            read_timeout (float): Seconds to wait for the response.
+            max_retries (int): Retries after the first attempt for idempotent failures.
+            backoff_base (float): Base delay in seconds of the exponential backoff.
+            backoff_max (float): Upper bound in seconds of a single backoff delay.
+            pool_size (int): Number of keep-alive connections kept per host.
+            breaker (CircuitBreaker, optional): Circuit breaker to use. Defaults to a new one.
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.session: Optional["requests.Session"] = None  # Created on the first call
+        self._lock = threading.Lock()
+        self.requests = 0  # Number of HTTP requests sent, including retries
+        self.retries = 0  # Number of retried attempts
+        self.failures = 0  # Number of calls that failed after all retries
+        self.rejected = 0  # Number of calls rejected by the open circuit breaker
+
+    def __session(self) -> "requests.Session":
+        """Returns the pooled session, importing `requests` and creating it on first use."""
+        if self.session is None:
+            import requests #type: ignore
+            from requests.adapters import HTTPAdapter #type: ignore
+
+            with self._lock:
+                if self.session is None:
+                    session = requests.Session()
+                    # Retries are handled in `get` so that they are visible to the circuit breaker
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self.session = session
+        return self.session
+
+    def __count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def __backoff(self, attempt: int) -> float:
+        """Returns the delay before the next attempt using full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, params: Dict, deadline: Optional[float] = None,
+            acquire_retry: Optional[Callable[[], bool]] = None) -> "requests.Response":
+        """Performs a GET request against the OpenWeatherMap API.
+
+        Args:
+            url (str): Endpoint to call.
+            params (dict): Query parameters of the request.
+            deadline (float, optional): `time.monotonic()` by which the call has to be done. The
+                                        timeouts are shortened and no retry is started after it.
+            acquire_retry (callable, optional): Asked before every retry, no retry is sent if it
+                                                returns False, e.g. because the quota is used up.
+
+        Returns:
+            requests.Response: The response of the upstream. Non-retryable error statuses
+            (e.g. 404 city not found) are returned to the caller unchanged.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            UpstreamError: If the call still failed after all retries, the deadline passed or
+                           OpenWeatherMap answered 429 (too many requests).
+        """
+        if deadline is not None and deadline <= time.monotonic():
+            raise UpstreamError("No time left to call OpenWeatherMap")
+        if not self.breaker.allow_request():
+            self.__count("rejected")
+            raise CircuitOpenError("OpenWeatherMap circuit breaker is open")
+
+        session = self.__session()
+        import requests #type: ignore
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.__backoff(attempt - 1)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    break  # No time left for another attempt
+                if acquire_retry is not None and not acquire_retry():
+                    break  # No quota left for another attempt
+                self.__count("retries")
+                time.sleep(delay)
+            timeout = (self.connect_timeout, self.read_timeout)
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0.01)
+                timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+            self.__count("requests")
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.increment("owm_responses_total", "error")
+                logging.warning("⚠️ OpenWeatherMap request failed (attempt %d): %s", attempt + 1, e)
+                error = e
+                continue
+            except requests.RequestException as e:
+                # Not safe to retry (e.g. an invalid URL)
+                metrics.increment("owm_responses_total", "error")
+                self.__count("failures")
+                self.breaker.record_failure()
+                raise UpstreamError(f"OpenWeatherMap request failed: {e}") from e
+            metrics.increment("owm_responses_total", response.status_code)
+            if response.status_code == THROTTLED_STATUS_CODE:
+                self.__count("failures")
+                self.breaker.record_failure()
+                raise UpstreamError("OpenWeatherMap returned 429, the quota of the API key is used up")
+            if response.status_code in RETRY_STATUS_CODES:
+                logging.warning("⚠️ OpenWeatherMap returned %s (attempt %d)", response.status_code, attempt + 1)
+                error = UpstreamError(f"OpenWeatherMap returned {response.status_code}")
+                continue
+            self.breaker.record_success()
+            return response
+
+        self.__count("failures")
+        self.breaker.record_failure()
+        raise UpstreamError(f"OpenWeatherMap request failed: {error}") from error
+
+    def stats(self) -> Dict:
+        """Returns the client counters and circuit breaker state for monitoring."""
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+        stats["circuit_breaker"] = self.breaker.stats()
+        return stats
@@ -0,0 +1,155 @@
+from collections import Counter
+from typing import Dict, List
+import logging
+import threading
+import time
+
+from .forecast_cache import OWM_REFRESH_INTERVAL
+from .quota import QuotaExceededError
+
+class CityPopularity:
+    """Thread-safe table of how often each city was asked for."""
+
+    def __init__(self, max_cities: int = 1000):
+        """Initialize the popularity table.
+
+        Args:
+            max_cities (int): Number of cities kept; the least popular ones are dropped beyond that.
+        """
+        self.max_cities = max_cities
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, city: str) -> None:
+        """Counts a request for `city`."""
+        key = " ".join(city.split()).casefold()
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > 2 * self.max_cities:
+                self._counts = Counter(dict(self._counts.most_common(self.max_cities)))
+
+    def forget(self, city: str) -> None:
+        """Drops `city`, e.g. because OpenWeatherMap doesn't know it."""
+        key = " ".join(city.split()).casefold()
+        with self._lock:
+            self._counts.pop(key, None)
+
+    def top(self, n: int) -> List[str]:
+        """Returns the `n` most requested cities."""
+        with self._lock:
+            return [city for city, _ in self._counts.most_common(n)]
+
+    def decay(self) -> None:
+        """Halves all counts, so the table follows recent traffic."""
+        with self._lock:
+            self._counts = Counter({city: count // 2 for city, count in self._counts.items() if count > 1})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._counts)
+
+class PrefetchScheduler:
+    """Background thread that keeps the forecasts of the most popular cities warm.
+
+    Shortly after every OpenWeatherMap refresh the top-N cities of `Weather.city_popularity`
+    are fetched again, spending at most `quota_share` of the upstream call budget, so
+    interactive turns find a current forecast in the cache.
+    """
+
+    def __init__(self, weather, top_n: int = 20, calls_per_minute: int = 60, quota_share: float = 0.1,
+                 delay: float = 600, refresh_interval: int = OWM_REFRESH_INTERVAL):
+        """Initialize the scheduler.
+
+        Args:
+            weather (Weather): Weather instance whose cache is kept warm.
+            top_n (int): Number of popular cities refreshed per OpenWeatherMap update.
+            calls_per_minute (int): Upstream calls per minute allowed by the OpenWeatherMap plan.
+            quota_share (float): Share of `calls_per_minute` the scheduler may spend.
+            delay (float): Seconds after the refresh boundary before refreshing, to give OWM time to publish.
+            refresh_interval (int): Refresh cycle of the upstream data in seconds.
+        """
+        self.weather = weather
+        self.top_n = top_n
+        self.call_interval = 60 / max(calls_per_minute * quota_share, 1e-9)  # Seconds between two prefetch calls
+        self.delay = delay
+        self.refresh_interval = refresh_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.rounds = 0  # Number of completed refresh rounds
+        self.calls = 0  # Number of successful refreshes
+        self.skipped = 0  # Number of cities whose cached forecast was already current
+        self.failures = 0  # Number of failed refreshes
+        self.last_lag = None  # Seconds from the refresh boundary until the last round completed
+        self.next_run = None  # Unix time of the next refresh round
+
+    def __next_run(self, now: float) -> float:
+        """Returns the time of the next refresh round after `now`."""
+        boundary = now - now % self.refresh_interval + self.delay
+        return boundary if boundary > now else boundary + self.refresh_interval
+
+    def refresh(self, boundary: float) -> None:
+        """Refreshes the most popular cities, pacing the calls within the quota.
+
+        Cities whose cached forecast was already fetched after `boundary`, e.g. by a turn,
+        are skipped.
+
+        Args:
+            boundary (float): Unix time of the OpenWeatherMap refresh the round belongs to.
+        """
+        cities = self.weather.city_popularity.top(self.top_n)
+        logging.info("🔥 Prefetching %d popular cities", len(cities))
+        attempts = 0
+        for city in cities:
+            if self.weather.has_current_forecast(city, max(boundary, time.time())):
+                self.skipped += 1
+                continue
+            if attempts and self._stop.wait(self.call_interval):
+                return
+            attempts += 1
+            try:
+                self.weather.refresh_forecast(city)
+            except QuotaExceededError as e:
+                # The rest of the round would be refused as well, the next round tries again
+                self.failures += 1
+                logging.warning("⚠️ Prefetching stopped: %s", e)
+                break
+            except Exception as e:
+                self.failures += 1
+                logging.warning("⚠️ Prefetching %s failed: %s", city, e)
+            else:
+                self.calls += 1
+        self.rounds += 1
+        self.last_lag = time.time() - boundary
+        self.weather.city_popularity.decay()
+
+    def __run(self) -> None:
+        """Main loop of the background thread."""
+        while not self._stop.is_set():
+            self.next_run = self.__next_run(time.time())
+            if self._stop.wait(max(0.0, self.next_run - time.time())):
+                break
+            self.refresh(self.next_run - self.delay)
+
+    def start(self) -> None:
+        """Starts the background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.__run, name="forecast-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread."""
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        """Returns the scheduler counters for monitoring."""
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "tracked_cities": len(self.weather.city_popularity),
+            "rounds": self.rounds,
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_refresh_lag": self.last_lag,
+            "next_run": self.next_run,
+        }
@@ -0,0 +1,106 @@
+from collections import Counter
+from typing import Dict, Optional
+import threading
+import time
+
+from .owm_client import UpstreamError
+
+# Priority classes of upstream calls, highest first
+INTERACTIVE = "interactive"  # A user asked for a city
+FOLLOWUP = "followup"  # A followup turn of a conversation, e.g. "and tomorrow?"
+PREFETCH = "prefetch"  # Background refresh of popular cities
+BATCH = "batch"  # Queries of the /batch endpoint
+
+# Share of every quota window a priority class has to leave for the classes above it
+RESERVES = {
+    INTERACTIVE: 0.0,
+    FOLLOWUP: 0.05,
+    PREFETCH: 0.25,
+    BATCH: 0.5,
+}
+
+class QuotaExceededError(UpstreamError):
+    """Raised without contacting OpenWeatherMap when the call budget of a priority class is used up."""
+
+class TokenBucket:
+    """Calls allowed in one quota window, refilled continuously at the rate of the window."""
+
+    def __init__(self, capacity: float, period: float):
+        """Initialize a full bucket.
+
+        Args:
+            capacity (float): Calls allowed per window.
+            period (float): Length of the window in seconds.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period  # Tokens added per second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Adds the tokens accrued since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class QuotaManager:
+    """Keeps upstream calls within the per minute and per day limits of the OpenWeatherMap plan.
+
+    Every window is a token bucket. Every request sent upstream, retries included, takes
+    one token from every bucket, but a priority class may only take tokens while the
+    bucket holds more than its reserve (`RESERVES`), so a traffic spike of batch queries
+    or prefetching never uses the calls interactive turns need.
+    """
+
+    def __init__(self, calls_per_minute: int = 60, calls_per_day: Optional[int] = None):
+        """Initialize the quota manager.
+
+        Args:
+            calls_per_minute (int): Calls per minute allowed by the OpenWeatherMap plan.
+            calls_per_day (int, optional): Calls per day allowed by the plan, unlimited if not set.
+        """
+        self.buckets = {"minute": TokenBucket(calls_per_minute, 60)}
+        if calls_per_day:
+            self.buckets["day"] = TokenBucket(calls_per_day, 24 * 60 * 60)
+        self._lock = threading.Lock()
+        self.granted = Counter()  # Calls allowed per priority class
+        self.denied = Counter()  # Calls refused per priority class
+
+    def try_acquire(self, priority: str = INTERACTIVE) -> bool:
+        """Takes one call from every window if the priority class may still spend it.
+
+        Args:
+            priority (str): Priority class of the call, one of `RESERVES`.
+
+        Returns:
+            bool: True if the call may be made.
+        """
+        reserve = RESERVES[priority]
+        now = time.monotonic()
+        with self._lock:
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+                if bucket.tokens - 1 < bucket.capacity * reserve:
+                    self.denied[priority] += 1
+                    return False
+            for bucket in self.buckets.values():
+                bucket.tokens -= 1
+            self.granted[priority] += 1
+            return True
+
+    def remaining(self) -> Dict[str, float]:
+        """Returns the calls left in every window."""
+        now = time.monotonic()
+        with self._lock:
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            return {window: round(bucket.tokens, 2) for window, bucket in self.buckets.items()}
+
+    def stats(self) -> Dict:
+        """Returns the remaining budget and the calls allowed and refused for monitoring."""
+        remaining = self.remaining()
+        with self._lock:
+            return {
+                "windows": {window: {"capacity": bucket.capacity, "remaining": remaining[window]} for window, bucket in self.buckets.items()},
+                "granted": dict(self.granted),
+                "denied": dict(self.denied),
+            }
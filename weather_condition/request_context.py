@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+@dataclass(frozen=True)
+class RequestContext:
+    """Immutable per-turn state of a Dialogflow fulfillment request.
+
+    A new context is created for every request and passed through `Weather`, `DateHandler`
+    and `DialogHandler`, so a single `Weather` instance can serve concurrent turns.
+    """
+
+    result: Dict  # Query result of the Dialogflow request
+    query_text: Optional[str]  # Text the user typed
+    action: Optional[str]  # Action of the matched intent
+    parameters: Dict  # Parameters extracted by Dialogflow
+    city: Optional[str] = None  # City for which to fetch the weather
+    time: Any = None  # Time range for weather data (e.g. today, tomorrow or the next 2 days)
+    condition: Optional[list] = None  # Weather condition (e.g. rain, snow, cloudy)
+    temperature: Optional[list] = None  # Temperature data (e.g. hot, cold, warm)
+    wind_speed: Optional[list] = None  # Wind speed data
+    deadline: Optional[float] = None  # time.monotonic() by which the answer has to be sent
+    priority: str = "interactive"  # Priority class of upstream calls for this turn, see `quota`
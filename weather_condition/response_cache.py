@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import threading
+
+from .metrics import metrics
+
+class ResponseCache:
+    """Thread-safe LRU cache of rendered fulfillment responses.
+
+    Many turns ask the same question, e.g. today's weather in London. A response is
+    stored with the forecast it was rendered from and is only served for that same
+    forecast object, so a refreshed forecast invalidates it without bookkeeping. The
+    random phrasings of fallback responses are never stored.
+
+    Cached responses are shared between turns and have to be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """Initialize the response cache.
+
+        Args:
+            max_entries (int): Maximum number of responses kept, 0 disables the cache.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (forecast, response)
+        self._lock = threading.Lock()
+        self.hits = 0  # Responses served without formatting
+        self.misses = 0  # Responses that had to be rendered
+        self.invalidations = 0  # Responses dropped because their forecast was refreshed
+        self.evictions = 0  # Responses dropped to stay within max_entries
+
+    @staticmethod
+    def make_key(forecast, time, context, stale: bool = False) -> Optional[Hashable]:
+        """Builds the key of a response.
+
+        The key holds the city of the forecast, the validated date range, the attribute
+        that was asked for (in the order `DialogHandler` checks them) and whether the
+        forecast is out of date. The version of the forecast is checked by `get`.
+
+        Args:
+            forecast (CompactForecast): The forecast the response is rendered from.
+            time (tuple): Start and end date of the turn.
+            context (RequestContext): The request context with the condition, temperature and wind speed.
+            stale (bool): Whether the response says that the forecast is out of date.
+
+        Returns:
+            tuple or None: The key, or None if the request can't be keyed.
+        """
+        if context.condition:
+            # Only the condition formatter depends on the requested values
+            attribute = ("condition", tuple(context.condition))
+        elif context.temperature:
+            attribute = ("temperature",)
+        elif context.wind_speed:
+            attribute = ("wind_speed",)
+        else:
+            attribute = ("weather",)
+        key = (forecast.city_id or forecast.city_name, time[0], time[1], attribute, stale)
+        try:
+            hash(key)
+        except TypeError:
+            return None  # E.g. a condition that isn't a string
+        return key
+
+    def get(self, key: Hashable, forecast) -> Optional[Any]:
+        """Returns the response stored for `key` if it was rendered from `forecast`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                result = "miss"
+            elif entry[0] is not forecast:
+                # Rendered from an older forecast of the city
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                entry, result = None, "invalidated"
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = "hit"
+        metrics.increment("response_cache_total", result)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, forecast, response: Any) -> None:
+        """Stores a response and evicts the least recently used ones if the cache is full."""
+        with self._lock:
+            self._entries[key] = (forecast, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all responses from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Returns the cache counters for monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
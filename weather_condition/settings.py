@@ -0,0 +1,94 @@
+from typing import Dict, Optional
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+
+_lock = threading.Lock()
+_env_loaded = False
+_logging_configured = False
+_sample_rates: Dict[str, float] = {}
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, so messages are formatted on the writer thread.
+
+    The standard `QueueHandler` formats every record before queueing it, which would
+    keep the cost of formatting large payloads on the request thread. The queue never
+    leaves the process, so the record does not have to be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def getenv(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Returns a setting from the environment, loading the .env file on the first call.
+
+    Args:
+        name (str): Name of the environment variable, e.g. OWM_KEY.
+        default (str, optional): Value returned if the variable is not set.
+
+    Returns:
+        str or None: The value of the variable.
+    """
+    global _env_loaded
+    if not _env_loaded:
+        with _lock:
+            if not _env_loaded:
+                from dotenv import load_dotenv #type: ignore
+
+                # Load the .env file
+                load_dotenv()
+                _env_loaded = True
+    return os.getenv(name, default)
+
+def configure_logging() -> None:
+    """Sets up the query log on first use instead of as a side effect of importing the package.
+
+    Request threads only put records on a queue; a background thread formats them and
+    writes them to the file. The level is read from LOG_LEVEL (default INFO) and the
+    file from LOG_FILE. If the application already configured logging it is left alone.
+    """
+    global _logging_configured
+    with _lock:
+        if _logging_configured:
+            return
+        _logging_configured = True
+
+    from . import __date__, __version__
+
+    root = logging.getLogger()
+    if not root.handlers:
+        file_handler = logging.FileHandler(getenv("LOG_FILE", "weather_query.log"), encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',  # Log message format
+            datefmt='%Y-%m-%d %H:%M:%S'  # Date format
+        ))
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, file_handler)
+        listener.start()
+        atexit.register(listener.stop)  # Writes the remaining records on shutdown
+        root.addHandler(_DeferredQueueHandler(records))
+        # Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        root.setLevel(getenv("LOG_LEVEL", "INFO").upper())
+    logging.getLogger(__package__).info(f"Starting AI Weather Chatbot v{__version__} on {__date__}")
+
+def sampled(event: str, default_rate: float) -> bool:
+    """Decides whether to log one occurrence of a large or frequent event.
+
+    The share of occurrences logged is read once from LOG_SAMPLE_<EVENT> (e.g.
+    LOG_SAMPLE_OWM_PAYLOAD=1 logs every payload, 0 none).
+
+    Args:
+        event (str): Name of the event, e.g. owm_payload.
+        default_rate (float): Share logged if the variable is not set.
+
+    Returns:
+        bool: True if this occurrence should be logged.
+    """
+    rate = _sample_rates.get(event)
+    if rate is None:
+        rate = _sample_rates[event] = float(getenv(f"LOG_SAMPLE_{event.upper()}", str(default_rate)))
+    return rate > 0 and random.random() < rate
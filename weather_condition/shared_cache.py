@@ -0,0 +1,153 @@
+from typing import Dict, Hashable, Optional
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl #type: ignore
+except ImportError:  # Not available on Windows, where the cache is limited to one process
+    fcntl = None
+
+from .compact_forecast import CompactForecast
+
+MAGIC = b"OWMSHC01"
+FILE_HEADER = struct.Struct("<8sII")  # magic, number of slots, slot size
+SLOT_HEADER = struct.Struct("<IQdI")  # sequence, key hash, expires_at, payload length
+SLOT_SEQUENCE = struct.Struct("<I")
+SLOT_FIELDS = struct.Struct("<QdI")  # SLOT_HEADER without the sequence
+
+class SharedForecastCache:
+    """Forecast cache shared by all worker processes of a host through a memory-mapped file.
+
+    The file is a fixed table of slots addressed by the hash of the cache key. Writers take
+    an exclusive file lock; readers never lock, they use a sequence number per slot (seqlock)
+    to detect concurrent writes. Each worker keeps the decoded forecast of a slot and only
+    decodes it again when the slot's sequence number changed, so hot reads copy nothing but
+    the slot header.
+    """
+
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 4096):
+        """Open or create the shared cache file.
+
+        Args:
+            path (str): Path of the memory-mapped file, shared by all workers.
+            slots (int): Number of slots if the file is created.
+            slot_size (int): Size in bytes of a slot if the file is created.
+        """
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()  # Serializes the writers of this process
+        with self.__write_lock():
+            size = os.fstat(self._fd).st_size
+            if size < FILE_HEADER.size:
+                os.ftruncate(self._fd, FILE_HEADER.size + slots * slot_size)
+                os.pwrite(self._fd, FILE_HEADER.pack(MAGIC, slots, slot_size), 0)
+            magic, self.slots, self.slot_size = FILE_HEADER.unpack(os.pread(self._fd, FILE_HEADER.size, 0))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a shared forecast cache")
+        self._map = mmap.mmap(self._fd, FILE_HEADER.size + self.slots * self.slot_size)
+        self._decoded = {}  # slot -> (sequence, key hash, forecast) decoded by this worker
+        self.pid = os.getpid()
+        self.hits = 0  # Lookups of this worker answered from the shared file
+        self.misses = 0  # Lookups of this worker not found, expired or overwritten
+        self.decodes = 0  # Forecasts this worker had to decode from the file
+        self.writes = 0  # Forecasts this worker wrote
+        self.skipped = 0  # Forecasts too large for a slot
+
+    def __write_lock(self):
+        """Returns a context manager holding the exclusive lock of the file."""
+        cache = self
+
+        class WriteLock:
+            def __enter__(self):
+                cache._lock.acquire()
+                if fcntl is not None:
+                    fcntl.flock(cache._fd, fcntl.LOCK_EX)
+
+            def __exit__(self, *exc):
+                if fcntl is not None:
+                    fcntl.flock(cache._fd, fcntl.LOCK_UN)
+                cache._lock.release()
+
+        return WriteLock()
+
+    @staticmethod
+    def __hash(key: Hashable) -> int:
+        """Returns a hash of the key that is stable across processes."""
+        text = "|".join(map(str, key)) if isinstance(key, tuple) else str(key)
+        return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+    def __offset(self, slot: int) -> int:
+        return FILE_HEADER.size + slot * self.slot_size
+
+    def get(self, key: Hashable) -> Optional[CompactForecast]:
+        """Returns the shared forecast for `key` or None if missing or expired."""
+        key_hash = self.__hash(key)
+        slot = key_hash % self.slots
+        offset = self.__offset(slot)
+        sequence, stored_hash, expires_at, length = SLOT_HEADER.unpack_from(self._map, offset)
+        if sequence % 2 or stored_hash != key_hash or expires_at <= time.time():
+            self.misses += 1
+            return None
+
+        decoded = self._decoded.get(slot)
+        if decoded is not None and decoded[0] == sequence and decoded[1] == key_hash:
+            self.hits += 1
+            return decoded[2]
+
+        start = offset + SLOT_HEADER.size
+        payload = self._map[start:start + length]
+        # The slot was rewritten while reading it, treat it as a miss
+        if SLOT_SEQUENCE.unpack_from(self._map, offset)[0] != sequence:
+            self.misses += 1
+            return None
+        forecast = CompactForecast.from_bytes(payload)
+        self._decoded[slot] = (sequence, key_hash, forecast)
+        self.decodes += 1
+        self.hits += 1
+        return forecast
+
+    def put(self, key: Hashable, forecast: CompactForecast, expires_at: float) -> None:
+        """Writes a forecast to its slot, replacing whatever was stored there.
+
+        Args:
+            key (hashable): Cache key of the forecast.
+            forecast (CompactForecast): The forecast to share.
+            expires_at (float): Unix time at which the forecast expires.
+        """
+        payload = forecast.to_bytes()
+        if len(payload) > self.slot_size - SLOT_HEADER.size:
+            self.skipped += 1
+            logging.warning("⚠️ Forecast for %s is too large for the shared cache", forecast.city_name)
+            return
+        key_hash = self.__hash(key)
+        slot = key_hash % self.slots
+        offset = self.__offset(slot)
+        with self.__write_lock():
+            sequence = SLOT_SEQUENCE.unpack_from(self._map, offset)[0]
+            # An odd sequence marks the slot as being written, readers skip it
+            SLOT_SEQUENCE.pack_into(self._map, offset, (sequence + 1) % 2 ** 32)
+            start = offset + SLOT_HEADER.size
+            self._map[start:start + len(payload)] = payload
+            SLOT_FIELDS.pack_into(self._map, offset + SLOT_SEQUENCE.size, key_hash, expires_at, len(payload))
+            SLOT_SEQUENCE.pack_into(self._map, offset, (sequence + 2) % 2 ** 32)
+        self.writes += 1
+
+    def stats(self) -> Dict:
+        """Returns the counters of this worker for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "pid": self.pid,
+            "slots": self.slots,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "decodes": self.decodes,
+            "writes": self.writes,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,147 @@
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Optional
+import logging
+import threading
+
+if TYPE_CHECKING:
+    import asyncio
+
+class _Call:
+    """An upstream call in progress that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single upstream call.
+
+    The first thread asking for a key runs the call, every other thread asking for
+    the same key while it is in flight waits for and shares its result or error.
+    """
+
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0  # Number of upstream calls actually made
+        self.collapsed = 0  # Number of calls answered by another thread's upstream call
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Runs `fn` once for all concurrent callers of `key`.
+
+        Args:
+            key (hashable): Identity of the call, e.g. the (city, units, lang) forecast key.
+            fn (callable): Function performing the upstream call.
+            timeout (float, optional): Seconds to wait for a call already in flight. The
+                caller running `fn` itself is bounded by `fn`.
+
+        Returns:
+            The result of `fn`.
+
+        Raises:
+            TimeoutError: If the call in flight didn't finish within `timeout`.
+            Exception: The exception raised by `fn`, re-raised in every waiting thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            logging.info("🔗 Waiting for in-flight call for %s", key)
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"In-flight call for {key} didn't finish within {timeout:.2f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict:
+        """Returns the single-flight counters for monitoring."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": self.calls,
+                "collapsed": self.collapsed,
+            }
+
+class AsyncSingleFlight:
+    """asyncio counterpart of `SingleFlight` for coroutines running on one event loop."""
+
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._calls: Dict[Hashable, "asyncio.Future"] = {}
+        self.calls = 0  # Number of upstream calls actually made
+        self.collapsed = 0  # Number of calls answered by another coroutine's upstream call
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Awaits `fn` once for all concurrent callers of `key`.
+
+        Args:
+            key (hashable): Identity of the call, e.g. the (city, units, lang) forecast key.
+            fn (callable): Coroutine function performing the upstream call.
+            timeout (float, optional): Seconds to wait for a call already in flight. The
+                coroutine running `fn` itself is bounded by `fn`.
+
+        Returns:
+            The result of `fn`.
+
+        Raises:
+            TimeoutError: If the call in flight didn't finish within `timeout`.
+            Exception: The exception raised by `fn`, re-raised in every waiting coroutine.
+        """
+        import asyncio  # Only needed by the async webhook, kept out of the import of the package
+
+        future = self._calls.get(key)
+        if future is not None:
+            self.collapsed += 1
+            logging.info("🔗 Waiting for in-flight call for %s", key)
+            # Shield the shared call so a cancelled or timed out waiter does not cancel it for the others
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"In-flight call for {key} didn't finish within {timeout:.2f}s") from None
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.calls += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        """Returns the single-flight counters for monitoring."""
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+        }
@@ -1,107 +1,397 @@
-from dotenv import load_dotenv #type: ignore
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+import json
 import logging
-import requests #type: ignore
-import os 
+import time as clock
 
 from .dialog_handler import DialogHandler
 from .date_handler import DateHandler
-
-# Load the .env file
-load_dotenv()
-
-# Access the keys
-owm_key = os.getenv("OWM_KEY")
+from .forecast_cache import ForecastCache
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+from .owm_client import OWMClient, UpstreamError, decode_body
+from .request_context import RequestContext
+from .compact_forecast import CompactForecast
+from .prefetch import CityPopularity
+from .city_index import CityIndex
+from .quota import QuotaManager, QuotaExceededError, INTERACTIVE, FOLLOWUP, PREFETCH
+from .settings import configure_logging, getenv, sampled
+from .metrics import metrics
 
 class Weather:
     """Weather class for interacting with weather data from OpenWeatherMap API."""
     
     def __init__(self):
-        """Initialize the Weather class with necessary attributes."""
-        self.owm_api_key = owm_key  # OpenWeatherMap API key
-        self.base_url = "http://api.openweathermap.org/data/2.5/forecast"  # Base URL for weather data forecast 5 days
-        self.city = None  # City for which to fetch the weather
-        self.time = None  # Time range for weather data (e.g. today, tomorrow or the next 2 days)
-        self.condition = None  # Weather condition (e.g. rain, snow, cloudy)
-        self.temperature = None  # Temperature data (e.g. hot, cold, warm)
-        self.wind_speed = None  # Wind speed data
-        self.dialog_handler = DialogHandler() # Handler for dialog responses (the format of the response)
+        """Initialize the Weather class with necessary attributes.
+
+        The .env file is read and logging is set up here, on first use, rather than when
+        the package is imported.
+        """
+        configure_logging()
+        if getenv("METRICS_ENABLED", "0") == "1":
+            metrics.enabled = True  # Per-stage latencies on /metrics
+        self.owm_api_key = getenv("OWM_KEY")  # OpenWeatherMap API key
+        # Base URL for weather data forecast 5 days, OWM_BASE_URL points it e.g. at a local stand-in
+        self.base_url = getenv("OWM_BASE_URL", "http://api.openweathermap.org/data/2.5/forecast")
+        # Handler for dialog responses (the format of the response), with a cache of rendered forecasts
+        self.dialog_handler = DialogHandler(ResponseCache(int(getenv("RESPONSE_CACHE_SIZE", "1024"))))
         self.date_handler = DateHandler() # Hanlder for setting and transforming the correct date
+        self.forecast_cache = ForecastCache() # Cache for forecast data of recently requested cities
+        self.single_flight = SingleFlight() # Shares one upstream call between concurrent requests for the same city
+        self.owm_client = OWMClient() # Pooled HTTP client with timeouts, retries and circuit breaker
+        self.city_popularity = CityPopularity() # How often each city was asked for, used for prefetching
+        self.city_index = CityIndex(getenv("CITY_LIST_PATH"), self.__load_aliases(getenv("CITY_ALIASES_PATH"))) # Resolves city names and remembers unknown ones
+        self.city_index.load_in_background()  # Compiling a fresh city list takes seconds, turns don't wait for it
+        # Upstream call budget of the OpenWeatherMap plan, shared by turns, prefetching and batch queries
+        self.quota = QuotaManager(int(getenv("OWM_CALLS_PER_MINUTE", "60")), int(getenv("OWM_CALLS_PER_DAY", "0")) or None)
+        metrics.register_gauge("owm_quota_remaining", lambda: self.quota.remaining())
+        # Seconds a turn may take, Dialogflow gives up on the webhook after 5 seconds
+        self.deadline_budget = float(getenv("WEBHOOK_DEADLINE", "4.5"))
+        self.refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="forecast-refresh") # Refreshes stale forecasts in the background
+        self.forecast_store = None # Persistent forecasts, if FORECAST_STORE_PATH is set
+        self.shared_cache = None # Forecasts of all workers, if SHARED_CACHE_PATH is set
+        forecast_store_path = getenv("FORECAST_STORE_PATH")  # Optional SQLite file to persist forecasts across restarts
+        if forecast_store_path:
+            from .forecast_store import ForecastStore
+            self.forecast_store = ForecastStore(forecast_store_path)
+        shared_cache_path = getenv("SHARED_CACHE_PATH")  # Optional file to share forecasts between worker processes
+        if shared_cache_path:
+            from .shared_cache import SharedForecastCache
+            self.shared_cache = SharedForecastCache(shared_cache_path)
         
-    def __fetch_weather_forecast_data(self):
+    @staticmethod
+    def __load_aliases(path):
+        """Reads additional city aliases from a JSON file of alias -> city name, if set."""
+        if not path:
+            return None
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def __fetch_weather_forecast_data(self, city: str, deadline=None, priority: str = INTERACTIVE):
         """Fetches weather forecast data from OpenWeatherMap API for a specified city.
 
         Makes an HTTP GET request to the OpenWeatherMap API using the provided city name
-        and API key, and returns the response in JSON format.
+        and API key, and returns the forecast aggregated per day. Forecasts are served from
+        `self.forecast_cache` while the cached data is still current, and concurrent
+        requests for the same city share a single upstream call.
+
+        With a deadline, an expired forecast of the city is served instead if OpenWeatherMap
+        doesn't answer before the deadline or fails, and the refresh goes on in the background.
+        An expired forecast is also served if the quota of the priority class is used up.
+
+        Args:
+            city (str): City for which to fetch the weather.
+            deadline (float, optional): `time.monotonic()` by which the forecast is needed.
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Returns:
+            tuple: The `CompactForecast`, and the seconds since it expired if a stale forecast was served, else None.
+        """
+
+        params, cache_key = self._forecast_request(city)
+
+        # Serve the forecast from the cache if the city was requested recently
+        cached = self._cached_forecast(cache_key)
+        if cached is not None:
+            return cached, None
+
+        stale = self.forecast_cache.get_stale(cache_key)
+        if stale is None or deadline is None:
+            # Perform GET request to fetch data, shared with concurrent requests for the same city
+            try:
+                return self.single_flight.do(cache_key, lambda: self.__request_forecast_data(cache_key, params, deadline, priority),
+                                             timeout=self._remaining(deadline)), None
+            except QuotaExceededError:
+                if stale is None:
+                    raise
+                return self._serve_stale(cache_key, stale, "quota")
+
+        # Refresh in the background and wait for it only until the deadline
+        refresh = self.refresh_executor.submit(self.single_flight.do, cache_key, lambda: self.__request_forecast_data(cache_key, params, priority=priority))
+        try:
+            return refresh.result(timeout=self._remaining(deadline)), None
+        except FutureTimeoutError:
+            return self._serve_stale(cache_key, stale, "deadline")
+        except QuotaExceededError:
+            return self._serve_stale(cache_key, stale, "quota")
+        except Exception as e:
+            logging.warning("⚠️ Refreshing the forecast for %s failed: %s", cache_key[0], e)
+            return self._serve_stale(cache_key, stale, "error")
+
+    @staticmethod
+    def _remaining(deadline) -> Optional[float]:
+        """Returns the seconds left until `deadline`, or None without a deadline."""
+        if deadline is None:
+            return None
+        return max(deadline - clock.monotonic(), 0.0)
+
+    @staticmethod
+    def _serve_stale(cache_key, stale, reason: str):
+        """Counts and logs an expired forecast served instead of a current one.
+
+        Args:
+            cache_key (tuple): Key of the forecast in `self.forecast_cache`.
+            stale (tuple): The expired forecast and the seconds since it expired.
+            reason (str): Why it is served, deadline, error or quota.
+
+        Returns:
+            tuple: The forecast and its age.
+        """
+        forecast, age = stale
+        logging.warning("⏳ Serving the forecast for %s that expired %.0fs ago (%s)", cache_key[0], age, reason)
+        metrics.increment("stale_forecasts_total", reason)
+        metrics.observe("forecast_stale_age_seconds", age)
+        return forecast, age
+
+    def __request_forecast_data(self, cache_key, params, deadline=None, priority: str = INTERACTIVE):
+        """Performs the upstream request and caches successful forecasts.
+
+        Args:
+            cache_key (tuple): Key of the forecast in `self.forecast_cache`.
+            params (dict): Query parameters for the OpenWeatherMap API.
+            deadline (float, optional): `time.monotonic()` by which the request has to be done.
+            priority (str): Priority class of the upstream call, see `quota`.
 
         Returns:
-            dict: JSON response from the OpenWeatherMap API containing weather forecast data.
+            CompactForecast: The forecast in columnar form.
         """
+        self._acquire_quota(cache_key, priority)
+        with metrics.stage("upstream_fetch"):
+            response = self.owm_client.get(self.base_url, params=params, deadline=deadline,
+                                           acquire_retry=lambda: self._spend_quota(priority))
+        with metrics.stage("upstream_decode"):
+            data = decode_body(response.content)
+        # The payload is ~40 slots, only a sample of them is logged
+        if sampled("owm_payload", 0.01):
+            logging.info("📦 OpenWeatherMap payload for %s: %s", cache_key[0], data)
 
+        return self._store_forecast(cache_key, data)
+
+    def _spend_quota(self, priority: str) -> bool:
+        """Takes one upstream request from the quota of the priority class, retries included.
+
+        Args:
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Returns:
+            bool: True if the request may be sent.
+        """
+        if self.quota.try_acquire(priority):
+            return True
+        metrics.increment("owm_quota_denied_total", priority)
+        return False
+
+    def _acquire_quota(self, cache_key, priority: str) -> None:
+        """Takes the first upstream request of a call from the quota of the priority class.
+
+        Args:
+            cache_key (tuple): Key of the forecast in `self.forecast_cache`.
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Raises:
+            QuotaExceededError: If the priority class may not call OpenWeatherMap right now.
+        """
+        if not self._spend_quota(priority):
+            raise QuotaExceededError(f"Upstream quota of {priority} calls used up, not requesting {cache_key[0]}")
+
+    def _forecast_request(self, city: str):
+        """Builds the query parameters and cache key of a forecast request.
+
+        The city is resolved by `self.city_index` first, so aliases of a city share one
+        cache entry and cities with a known id are requested by id.
+
+        Args:
+            city (str): City for which to fetch the weather.
+
+        Returns:
+            tuple: The query parameters for the OpenWeatherMap API and the cache key.
+
+        Raises:
+            UpstreamError: If OpenWeatherMap recently answered that it doesn't know the city.
+        """
+        resolved = self.city_index.resolve(city)
+        if self.city_index.is_rejected(resolved.key):
+            raise UpstreamError(f"OpenWeatherMap doesn't know {city}")
         # Define request parameters
         params = {
-            "q": self.city,  # City name for which to fetch weather data
             "appid": self.owm_api_key,  # OpenWeatherMap API key
             "units": "metric",  # Use metric units for temperature
             "lang": "en",  # Use English language
         }
+        if resolved.city_id is not None:
+            params["id"] = resolved.city_id  # City id from the city list, no name matching upstream
+        else:
+            params["q"] = resolved.query  # City name for which to fetch weather data
+        return params, self.forecast_cache.make_key(resolved.key, params["units"], params["lang"])
+
+    def _cached_forecast(self, cache_key):
+        """Looks up a current forecast in the in-memory cache, the shared cache, then the persistent store.
+
+        Args:
+            cache_key (tuple): Key of the forecast in `self.forecast_cache`.
+
+        Returns:
+            CompactForecast or None: The cached forecast, or None if it has to be fetched.
+        """
+        cached = self.forecast_cache.get(cache_key)
+        if cached is not None:
+            logging.info("⚡ Cache hit for %s", cache_key[0])
+            metrics.increment("forecast_lookups_total", "memory")
+            return cached
+        if self.shared_cache is not None:
+            cached = self.shared_cache.get(cache_key)
+            if cached is not None:
+                logging.info("🔗 Shared cache hit for %s", cache_key[0])
+                metrics.increment("forecast_lookups_total", "shared")
+                cached.summary  # Build the daily summaries once per worker
+                self.forecast_cache.put(cache_key, cached, cached.first_slot)
+                return cached
+        if self.forecast_store is not None:
+            cached = self.forecast_store.get(cache_key)
+            if cached is not None:
+                logging.info("💾 Store hit for %s", cache_key[0])
+                metrics.increment("forecast_lookups_total", "store")
+                cached.summary  # Build the daily summaries once
+                self.forecast_cache.put(cache_key, cached, cached.first_slot)
+                if self.shared_cache is not None:
+                    self.shared_cache.put(cache_key, cached, self.forecast_cache.expires_at(cached.first_slot))
+                return cached
+        metrics.increment("forecast_lookups_total", "miss")
+        return None
+
+    def _store_forecast(self, cache_key, data: Dict) -> CompactForecast:
+        """Converts a forecast returned from the OpenWeatherMap API to its compact form and caches it.
+
+        The daily summaries are built right away, so cache hits only read them.
+
+        Args:
+            cache_key (tuple): Key of the forecast in `self.forecast_cache`.
+            data (dict): JSON response from the OpenWeatherMap API.
+
+        Returns:
+            CompactForecast: The forecast in columnar form.
+
+        Raises:
+            UpstreamError: If OpenWeatherMap didn't return a forecast (e.g. city not found).
+        """
+        # Only successful forecasts are cached, unknown cities are not asked for again for a while
+        if str(data.get("cod")) == "404":
+            self.city_index.reject(cache_key[0])
+            self.city_popularity.forget(cache_key[0])
+        if str(data.get("cod")) != "200":
+            raise UpstreamError(f"OpenWeatherMap returned {data.get('cod')}: {data.get('message')}")
+        forecast = CompactForecast.from_owm(data)
+        forecast.summary  # Build the daily summaries once
+        self.forecast_cache.put(cache_key, forecast, forecast.first_slot)
+        if self.shared_cache is not None:
+            self.shared_cache.put(cache_key, forecast, self.forecast_cache.expires_at(forecast.first_slot))
+        if self.forecast_store is not None:
+            # Written by the store's background thread
+            self.forecast_store.put(cache_key, forecast, self.forecast_cache.expires_at(forecast.first_slot))
+        return forecast
+
+    def get_forecast(self, city: str, priority: str = INTERACTIVE) -> CompactForecast:
+        """Returns the forecast of a city from the cache or OpenWeatherMap.
+
+        Args:
+            city (str): City for which to fetch the weather.
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Returns:
+            CompactForecast: The forecast in columnar form, possibly expired if the quota is used up.
+        """
+        return self.__fetch_weather_forecast_data(city, priority=priority)[0]
+
+    def refresh_forecast(self, city: str, priority: str = PREFETCH) -> CompactForecast:
+        """Fetches the forecast of a city from OpenWeatherMap, bypassing the cache.
+
+        Args:
+            city (str): City for which to fetch the weather.
+            priority (str): Priority class of the upstream call, see `quota`.
+
+        Returns:
+            CompactForecast: The forecast in columnar form.
+
+        Raises:
+            QuotaExceededError: If the quota of the priority class is used up.
+        """
+        params, cache_key = self._forecast_request(city)
+        return self.single_flight.do(cache_key, lambda: self.__request_forecast_data(cache_key, params, priority=priority))
 
-        # Perform GET request to fetch data
-        response = requests.get(self.base_url, params=params)
-        logging.info(response.json())
-        print(response.json())
+    def has_current_forecast(self, city: str, when: float) -> bool:
+        """Returns whether the cached forecast of a city is still current at unix time `when`.
 
-        # Return the JSON response
-        return response.json()
+        Args:
+            city (str): City for which to check the weather.
+            when (float): Unix time the forecast has to be current at.
+        """
+        _, cache_key = self._forecast_request(city)
+        return self.forecast_cache.is_current(cache_key, when)
+
+    def stats(self) -> Dict:
+        """Returns the state of the forecast cache and the upstream client for monitoring."""
+        return {
+            "forecast_cache": self.forecast_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "owm_client": self.owm_client.stats(),
+            "forecast_store": self.forecast_store.stats() if self.forecast_store is not None else None,
+            "shared_cache": self.shared_cache.stats() if self.shared_cache is not None else None,
+            "city_index": self.city_index.stats(),
+            "quota": self.quota.stats(),
+            "response_cache": self.dialog_handler.response_cache.stats(),
+        }
 
-    def __fetch_weather(self, time_range):
+    def __fetch_weather(self, context: RequestContext, time_range):
         """Fetches and formats weather data based on request parameters.
 
         Makes an HTTP GET request to the OpenWeatherMap API using the provided city name
         and API key, and formats the response into a human-readable format.
 
         Args:
+            context (RequestContext): State of the current request.
             time_range (str): Time range for which to fetch weather data.
 
         Returns:
             str: Formatted weather data as a string.
         """
-        if not self.city:
+        if not context.city:
             return self.dialog_handler.handle_missing_city()  # Use DialogHandler for missing city
-        logging.info(f"📡 Fetching weather for {self.city} at {self.time}")
-        data = self.__fetch_weather_forecast_data()
-        #print(data)
-        return self.dialog_handler.format_forecast_output(self, time_range, data)
+        logging.info("📡 Fetching weather for %s at %s", context.city, context.time)
+        data, stale_age = self.__fetch_weather_forecast_data(context.city, context.deadline, context.priority)
+        return self.dialog_handler.format_forecast_output(context, time_range, data, stale=stale_age is not None)
 
-    def __get_city(self):
+    def __get_city(self, result: Dict, parameters: Dict):
         """Gets the city from the user's input."""
-        logging.info("📍Getting city...")
-        city = self.parameters.get("geo-city")
+        logging.debug("📍Getting city...")
+        city = parameters.get("geo-city")
         try:
             # If the city is not in the current context, try to get it from the output context
             if not city:
-                city = self.result.get("outputContexts", [])[0].get("parameters", {}).get("geo-city", [])
-            logging.info(f"📍city: {city[0]}")
+                city = result.get("outputContexts", [])[0].get("parameters", {}).get("geo-city", [])
+            logging.info("📍city: %s", city[0])
+            # Aliases of a city are one entry, cities OpenWeatherMap doesn't know aren't prefetched
+            key = self.city_index.known_key(city[0])
+            if key is not None:
+                self.city_popularity.record(key)
             # Return the first city if multiple are provided
             return city[0]
         except Exception as e:
-            logging.error(f"Failed to find 📍city: {e}")
+            logging.error("Failed to find 📍city: %s", e)
             return None
     
-    def __get_date(self):
+    def __get_date(self, result: Dict, parameters: Dict):
         """Gets the date from the user's input."""
-        logging.info("🕐 Getting date...")
-        time = self.parameters.get("date-time")
-        print(time)
+        logging.debug("🕐 Getting date...")
+        time = parameters.get("date-time")
         try:
             # If the city is not in the current context, try to get it from the output context
             if not time:
-                time = self.result.get("outputContexts", [])[0].get("parameters", {}).get("date-time", [])
-            logging.info(f"🕐 date: {time[0]}")
+                time = result.get("outputContexts", [])[0].get("parameters", {}).get("date-time", [])
+            logging.info("🕐 date: %s", time[0])
             # Return the first city if multiple are provided
             return time
         except Exception as e:
-            logging.error(f"Failed to find 🕐 date: {e}")
+            logging.error("Failed to find 🕐 date: %s", e)
             return None
        
         
@@ -110,6 +400,8 @@ class Weather:
 
         This function is responsible for extracting information from the user’s request and 
         then invoking the necessary methods to retrieve the appropriate weather data.
+        The state of the request is kept in a `RequestContext`, so concurrent requests
+        can share one `Weather` instance.
 
         Args:
             request (dict): The user's query request.
@@ -118,31 +410,68 @@ class Weather:
             dict: A dictionary containing the response to the user.
         """
         
-        logging.info("🔄 Request in progress…")
+        logging.debug("🔄 Request in progress…")
+        prepared = self._prepare_request(request)
+        if isinstance(prepared, dict):
+            return prepared  # Fallback response, e.g. missing city or invalid date
+        context, time = prepared
+        
+        try:
+            # Fetch and format the weather data
+            speech = self.__fetch_weather(context, time)
+            logging.info("🔊 Response: %s", speech)
+            return speech
+        except Exception as e:
+            logging.error("⛔ Error Fetching Weather Data: %s", e)
+            return self.dialog_handler.handle_error()  # Handle general error
+
+    def _prepare_request(self, request: Dict):
+        """Extracts the request context and validates the requested date range.
+
+        Args:
+            request (dict): The user's query request.
+
+        Returns:
+            tuple or dict: The `RequestContext` and the validated time range,
+                           or a fallback response if the request can't be answered.
+        """
+        deadline = clock.monotonic() + self.deadline_budget
         try:
             # Extract query result from the request
-            self.result = request.get("queryResult")
-            self.query_text = self.result.get("queryText")
-            logging.info(f"💬 User Intent: {self.query_text}")
+            result = request.get("queryResult")
+            query_text = result.get("queryText")
+            logging.info("💬 User Intent: %s", query_text)
             
             # Extract action and parameters from the result
-            self.action = self.result.get("action")
-            self.parameters = self.result.get("parameters")
-            self.condition = self.parameters.get("weather-condition")
-            self.temperature = self.parameters.get("temperature")
-            self.wind_speed = self.parameters.get("wind-speed")
+            parameters = result.get("parameters")
             
             # Get city from the user's input
-            self.city = self.__get_city()
-            if not self.city:
+            with metrics.stage("get_city"):
+                city = self.__get_city(result, parameters)
+            if not city:
                 logging.info("❌ No city detected. Trigger fallback -> Request City.")
                 return self.dialog_handler.handle_missing_city()
 
-            # Get date from the user's input
-            self.time = self.__get_date()
+            with metrics.stage("get_date"):
+                time = self.__get_date(result, parameters)  # Get date from the user's input
+            context = RequestContext(
+                result=result,
+                query_text=query_text,
+                action=result.get("action"),
+                parameters=parameters,
+                city=city,
+                time=time,
+                condition=parameters.get("weather-condition"),
+                temperature=parameters.get("temperature"),
+                wind_speed=parameters.get("wind-speed"),
+                deadline=deadline,
+                # A city carried over from the output context means a followup turn, e.g. "and tomorrow?"
+                priority=INTERACTIVE if parameters.get("geo-city") else FOLLOWUP,
+            )
             
             # Check if the date range is valid
-            time = self.date_handler.check_date_range(self.time)
+            with metrics.stage("check_date_range"):
+                time = self.date_handler.check_date_range(context.time)
             if time is True:  # If the start date is in the past
                 logging.info("❌ Start date is in the past. Trigger fallback.")
                 return self.dialog_handler.handle_past_date()
@@ -153,14 +482,7 @@ class Weather:
                 return time
             
         except Exception as e:
-            logging.error(f"⛔ Error: {e}")
-            return self.dialog_handler.handle_error()  # Handle general error
-        
-        try:
-            # Fetch and format the weather data
-            speech = self.__fetch_weather(time)
-            logging.info(f"🔊 Response: {speech}")
-            return speech
-        except Exception as e:
-            logging.error(f"⛔ Error Fetching Weather Data: {e}")
+            logging.error("⛔ Error: %s", e)
             return self.dialog_handler.handle_error()  # Handle general error
+
+        return context, time